@@ -0,0 +1,19 @@
+# encoding: utf-8
+# SSHPLUS - Núcleo compartilhado dos proxies (HTTP, SOCKS/open e WebSocket)
+#
+# proxy.py, open.py e wsproxy.py são perfis finos sobre este pacote:
+#   config     - ProxyConfig (constantes do perfil + linha de comando)
+#   handshake  - parser incremental dos headers (X-Real-Host / X-Split / X-Pass)
+#   buffers    - AdaptiveBuffer por sentido do túnel
+#   relay      - pipe stream (StreamReader/Writer) e despacho para splice
+#   idle       - IdleWheel: timeout de inatividade de todos os túneis do loop
+#   heartbeat  - Heartbeat: auto-ping (KEEPALIVE) dos túneis parados, um timer por loop
+#   shaping    - limite de banda por túnel, usuário e total (token bucket)
+#   resolver   - DNSCache dos destinos (TTL, LRU, cache negativo, coalescência)
+#   metrics    - contadores e histogramas de latência do proxy
+#   server     - ProxyServer e ciclo de vida (start/drenagem/workers)
+#   handoff    - entrega dos listeners à versão nova (-u) por SCM_RIGHTS
+#   exporter   - endpoint OpenMetrics (-m)
+#   websocket  - frames RFC 6455 do wsproxy.py no modo -s frame
+#   deflate    - permessage-deflate dos túneis com frames (DEFLATE=1)
+# Carregados sob demanda: splice, protocol, pool, exporter, handoff, websocket, deflate.
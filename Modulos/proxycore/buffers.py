@@ -0,0 +1,69 @@
+# encoding: utf-8
+# SSHPLUS - Buffer adaptativo dos pipes
+
+import time
+
+class AdaptiveBuffer:
+    """Buffer adaptativo: um por sentido de cada túnel, ajustado no próprio pipe"""
+    def __init__(self, sizes: dict, min_size: int = 4096, max_size: int = 65536,
+                 interval: float = 0.5, full_read_streak: int = 4):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.interval = interval
+        self.full_read_streak = full_read_streak
+        self.sizes = sizes  # tamanho -> nº de pipes usando, exposto nas métricas
+        self.size = 0
+        self._resize(min_size)
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._reads = 0
+        self._full_reads = 0
+        self._full_streak = 0
+
+    @classmethod
+    def from_config(cls, config, sizes: dict):
+        return cls(sizes, config.buffer_min, config.buffer_max,
+                   config.buffer_interval, config.full_read_streak)
+
+    def _resize(self, size: int):
+        if size == self.size:
+            return
+        if self.size:
+            self.release()
+        self.size = size
+        self.sizes[size] = self.sizes.get(size, 0) + 1
+
+    def record(self, nbytes: int):
+        """Registra uma leitura; leituras cheias seguidas dobram o buffer na hora"""
+        self._window_bytes += nbytes
+        self._reads += 1
+        if nbytes >= self.size:
+            self._full_reads += 1
+            self._full_streak += 1
+            if self._full_streak >= self.full_read_streak and self.size < self.max_size:
+                self._full_streak = 0
+                self._resize(min(self.size * 2, self.max_size))
+        else:
+            self._full_streak = 0
+
+        elapsed = time.monotonic() - self._window_start
+        if elapsed >= self.interval:
+            self.adjust(self._window_bytes, elapsed, self._full_reads / self._reads)
+            self._window_start += elapsed
+            self._window_bytes = self._reads = self._full_reads = 0
+
+    def adjust(self, bytes_transferred: int, time_elapsed: float, fill_ratio: float = 0.0):
+        if time_elapsed > 0:
+            throughput = bytes_transferred / time_elapsed
+            if throughput > 1000000 or fill_ratio >= 0.5:  # >1MB/s ou leituras cheias
+                self._resize(min(self.size * 2, self.max_size))
+            elif throughput < 100000 and fill_ratio < 0.1:  # <100KB/s e leituras curtas
+                self._resize(max(self.size // 2, self.min_size))
+
+    def release(self):
+        """Remove este pipe da contagem de tamanhos"""
+        count = self.sizes.get(self.size, 0) - 1
+        if count > 0:
+            self.sizes[self.size] = count
+        else:
+            self.sizes.pop(self.size, None)
@@ -0,0 +1,210 @@
+# encoding: utf-8
+# SSHPLUS - Configuração de perfil dos proxies
+# As constantes do perfil são o padrão; /etc/SSHPlus/<perfil>.conf (CHAVE=valor)
+# sobrescreve MSG, COR, PASS, DEFAULT_HOST, BUFLEN, TIMEOUT, DRAIN, os limites
+# de banda RATE_*, os de buffer WRITE_*, a compressão DEFLATE* e o pool POOL_*
+# na partida e a cada SIGHUP, sem fechar o listener nem os túneis abertos.
+
+import getopt
+import os
+import sys
+
+CONF_DIR = '/etc/SSHPlus'
+# chave do .conf -> (atributo, conversão)
+RELOADABLE = {
+    'MSG': ('msg', str),
+    'COR': ('color', str),
+    'PASS': ('password', str),
+    'DEFAULT_HOST': ('default_host', str),
+    'BUFLEN': ('buflen', int),
+    'TIMEOUT': ('timeout', float),
+    'DRAIN': ('drain_timeout', float),
+    'RATE_TUNNEL': ('rate_tunnel', float),
+    'RATE_USER': ('rate_user', float),
+    'RATE_TOTAL': ('rate_total', float),
+    'WRITE_HIGH': ('write_high', int),
+    'WRITE_LOW': ('write_low', int),
+    'DEFLATE': ('deflate', int),
+    'DEFLATE_BITS': ('deflate_bits', int),
+    'DEFLATE_NO_CONTEXT': ('deflate_no_context', int),
+    'DEFLATE_MEMORY': ('deflate_memory', int),
+    'POOL_WARM': ('pool_warm', int),
+    'POOL_MAX': ('pool_max', int),
+    'POOL_IDLE': ('pool_idle', float),
+}
+RATES = ('rate_tunnel', 'rate_user', 'rate_total')
+
+def read_conf(path: str) -> dict:
+    """Linhas CHAVE=valor; '#' comenta, aspas em volta do valor são opcionais"""
+    values = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, _, value = line.partition('=')
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+                value = value[1:-1]
+            values[key.strip()] = value
+    return values
+
+class ProxyConfig:
+    """Parâmetros de um perfil: constantes do script + opções de linha de comando"""
+    def __init__(self, name: str, title: str, mode: str, default_host: str,
+                 default_port: int, status: int = 200, msg: str = '', color: str = None,
+                 host: str = '0.0.0.0',
+                 port: int = 80, password: str = '', buflen: int = 65536,
+                 timeout: float = 60, footer: str = 'SSHPLUS', relay: str = 'stream',
+                 core: str = 'stream', workers: int = 0, keepalive: float = 0,
+                 pool: bool = False, log_connect: bool = False, websocket: str = 'raw'):
+        self.name = name
+        self.title = title
+        self.mode = mode
+        self.footer = footer
+        self.status = status
+        self.msg = msg
+        self.color = color          # None = status sem <font color>
+        self.response = self.build_response()
+        self.conf = None            # -f; padrão /etc/SSHPlus/<perfil>.conf
+        self.default_host = default_host
+        self.default_port = default_port
+        self.host = host
+        self.port = port
+        self.password = password
+        self.buflen = buflen
+        self.timeout = timeout
+        self.handshake_timeout = 10
+        self.drain_timeout = 30     # SIGTERM: prazo (s) para os túneis abertos terminarem
+        self.upgrade = False        # -u: herda os listeners do processo em execução
+        self.rate_tunnel = 0        # kbit/s por túnel, por sentido; 0 = sem limite
+        self.rate_user = 0          # kbit/s somando os túneis do mesmo X-Pass (ou IP)
+        self.rate_total = 0         # kbit/s de todos os túneis da porta
+        self.processes = 1          # workers atendendo a porta (dividem RATE_TOTAL)
+        # Buffer de escrita por conexão (bytes): acima de write_high a origem para
+        # de ser lida até o buffer cair a write_low. Vale para túneis novos.
+        self.write_high = 16384
+        self.write_low = 4096
+        self.relay = relay          # 'stream' ou 'splice' (zero-copy, apenas Linux)
+        self.core = core            # 'stream' (StreamReader/Writer) ou 'protocol' (BufferedProtocol)
+        self.workers = workers      # 0 = um worker por CPU (SO_REUSEPORT), 1 = processo único
+        self.keepalive = keepalive  # intervalo do auto-ping (s); 0 desliga
+        self.websocket = websocket  # 'raw' (TCP puro após o 101) ou 'frame' (RFC 6455)
+        # permessage-deflate no modo frame (vale para túneis novos)
+        self.deflate = 0            # 1 aceita a extensão quando o cliente oferece
+        self.deflate_bits = 15      # server_max_window_bits (9-15)
+        self.deflate_no_context = 0 # 1 = server_no_context_takeover (compressor compartilhado)
+        self.deflate_memory = 131072  # bytes de zlib por túnel; janelas encolhem até caber
+        self.pool = pool
+        # Conexões de reserva com o destino (perfis com pool)
+        self.pool_warm = 0          # reservas por destino já usado; 0 = desligado (ver pool.py)
+        self.pool_max = 100         # total de reservas do processo
+        self.pool_idle = 30         # s até fechar uma reserva parada (< LoginGraceTime)
+        self.log_connect = log_connect
+        self.dns_ttl = 60           # cache de DNS dos destinos (s)
+        self.dns_negative_ttl = 5   # falhas de resolução ficam em cache por menos tempo
+        self.dns_cache_size = 1024
+        self.metrics_host = '127.0.0.1'
+        self.metrics_port = 0       # endpoint OpenMetrics (GET /metrics); 0 desliga
+        self.chunk = 16384          # buffer de relay por conexão no núcleo protocol
+        self.buffer_min = 4096
+        self.buffer_max = 65536
+        self.buffer_interval = 0.5  # janela (s) de medição do throughput de cada pipe
+        self.full_read_streak = 4
+
+    @property
+    def label(self) -> str:
+        """Nome do perfil sem extensão (label proxy= das métricas)"""
+        return self.name.rsplit('.', 1)[0]
+
+    def build_response(self) -> bytes:
+        """Linha de status enviada ao cliente após o handshake"""
+        text = self.msg if self.color is None else f'<font color="{self.color}">{self.msg}</font>'
+        return f"HTTP/1.1 {self.status} {text}\r\n\r\n".encode()
+
+    @property
+    def conf_path(self) -> str:
+        return self.conf or os.path.join(CONF_DIR, f'{self.label}.conf')
+
+    def load(self) -> dict:
+        """Aplica o .conf (se existir); devolve {chave: valor novo} do que mudou
+
+        Tudo é validado antes de aplicar: um valor inválido levanta ValueError
+        e a configuração em uso fica intacta. RESPONSE é remontada e trocada
+        numa única atribuição.
+        """
+        try:
+            values = read_conf(self.conf_path)
+        except FileNotFoundError:
+            return {}
+        updates = {}
+        for key, value in values.items():
+            if key not in RELOADABLE:
+                continue
+            attr, convert = RELOADABLE[key]
+            try:
+                updates[attr] = convert(value)
+            except ValueError:
+                raise ValueError(f'{key}={value!r} inválido em {self.conf_path}')
+        if (updates.get('buflen', self.buflen) < 1024 or updates.get('timeout', self.timeout) <= 0
+                or updates.get('drain_timeout', self.drain_timeout) < 0
+                or any(updates.get(attr, 0) < 0 for attr in RATES)
+                or not 0 <= updates.get('write_low', self.write_low) <= updates.get('write_high', self.write_high)
+                or not 9 <= updates.get('deflate_bits', self.deflate_bits) <= 15
+                or updates.get('deflate_memory', self.deflate_memory) < 0
+                or updates.get('pool_warm', self.pool_warm) < 0 or updates.get('pool_max', self.pool_max) < 0
+                or updates.get('pool_idle', self.pool_idle) <= 0):
+            raise ValueError(f'BUFLEN/TIMEOUT/DRAIN/RATE/WRITE/DEFLATE/POOL fora do intervalo em {self.conf_path}')
+        changed = {attr: value for attr, value in updates.items() if getattr(self, attr) != value}
+        for attr, value in changed.items():
+            setattr(self, attr, value)
+        if {'msg', 'color'} & changed.keys():
+            self.response = self.build_response()
+        return changed
+
+    def print_usage(self):
+        print(f'Use: {self.name} <porta>')
+        print(f'     {self.name} -b <ip> -p <porta> [-r stream|splice] [-c stream|protocol] [-w workers]')
+        print(f'     {"":{len(self.name)}} [-m [ip:]porta-metricas] [-f arquivo.conf] [-d prazo-drenagem] [-u]')
+        if self.status == 101:
+            print(f'     {"":{len(self.name)}} [-s raw|frame]')
+
+    def parse_args(self, argv):
+        try:
+            opts, args = getopt.gnu_getopt(
+                argv, "hb:p:r:c:w:m:f:d:us:",
+                ["bind=", "port=", "relay=", "core=", "workers=", "metrics=", "conf=",
+                 "drain=", "upgrade", "websocket="]
+            )
+        except getopt.GetoptError:
+            self.print_usage()
+            sys.exit(2)
+
+        if args and args[0].isdigit():
+            self.port = int(args[0])
+        for opt, arg in opts:
+            if opt == '-h':
+                self.print_usage()
+                sys.exit()
+            elif opt in ("-b", "--bind"):
+                self.host = arg
+            elif opt in ("-p", "--port"):
+                self.port = int(arg)
+            elif opt in ("-r", "--relay"):
+                self.relay = arg
+            elif opt in ("-c", "--core"):
+                self.core = arg
+            elif opt in ("-w", "--workers"):
+                self.workers = int(arg)
+            elif opt in ("-m", "--metrics"):
+                host, _, port = arg.rpartition(':')
+                self.metrics_host = host or self.metrics_host
+                self.metrics_port = int(port)
+            elif opt in ("-f", "--conf"):
+                self.conf = arg
+            elif opt in ("-d", "--drain"):
+                self.drain_timeout = float(arg)
+            elif opt in ("-u", "--upgrade"):
+                self.upgrade = True
+            elif opt in ("-s", "--websocket"):
+                self.websocket = arg
@@ -0,0 +1,179 @@
+# encoding: utf-8
+# SSHPLUS - permessage-deflate (RFC 7692) dos túneis com frames do wsproxy.py
+#
+# Negociado só no modo -s frame com DEFLATE=1 no .conf. Cada túnel tem um
+# orçamento de memória de zlib (DEFLATE_MEMORY): a janela do cliente e a do
+# servidor encolhem até caber; se nem assim couber um compressor próprio, o
+# túnel passa a server_no_context_takeover e usa o compressor compartilhado
+# do processo. Cada mensagem termina com Z_FULL_FLUSH, que zera o dicionário,
+# então o mesmo contexto serve a todos os túneis (o loop é um só thread).
+# Mensagens que não encolhem (SSH já cifrado) fazem o túnel parar de
+# comprimir por um número crescente de mensagens antes de tentar de novo.
+
+import time
+import zlib
+
+LEVEL = 6
+MIN_BITS, MAX_BITS = 9, 15      # zlib não aceita janela raw de 8 bits
+INFLATE_OVERHEAD = 7168         # bytes fixos de um inflate além da janela
+INFLATE_LIMIT = 1 << 20         # máximo descomprimido por leitura do cliente
+TAIL = b'\x00\x00\xff\xff'      # fim do Z_SYNC_FLUSH, omitido nos frames
+MIN_SIZE = 128                  # mensagens menores vão sem comprimir
+SKIP_RATIO = 0.9                # saída/entrada acima disso não compensa
+SKIP_FIRST, SKIP_MAX = 16, 1024 # mensagens sem comprimir após cada fracasso
+PARAMS = ('server_no_context_takeover', 'client_no_context_takeover',
+          'server_max_window_bits', 'client_max_window_bits')
+
+_shared = {}    # (bits, mem_level) -> compressor dos túneis sem context takeover
+
+def inflate_cost(bits: int) -> int:
+    return (1 << bits) + INFLATE_OVERHEAD
+
+def deflate_cost(bits: int, mem_level: int) -> int:
+    """Memória de um deflateInit2 segundo o zconf.h"""
+    return (1 << (bits + 2)) + (1 << (mem_level + 9))
+
+def shared_compressor(bits: int):
+    key = (bits, 8)
+    compressor = _shared.get(key)
+    if compressor is None:
+        compressor = _shared[key] = zlib.compressobj(LEVEL, zlib.DEFLATED, -bits, 8)
+    return compressor
+
+def _parse(offer: str):
+    """'permessage-deflate; a; b=1' -> {parâmetro: valor}; None se não serve"""
+    name, *params = [part.strip() for part in offer.split(';')]
+    if name != 'permessage-deflate':
+        return None
+    values = {}
+    for param in params:
+        key, sep, value = param.partition('=')
+        key = key.strip()
+        if key not in PARAMS or key in values:
+            return None
+        values[key] = value.strip().strip('"') if sep else None
+    for key in ('server_max_window_bits', 'client_max_window_bits'):
+        value = values.get(key)
+        if value is not None and not (value.isdigit() and 8 <= int(value) <= MAX_BITS):
+            return None
+    if values.get('server_max_window_bits', '') is None:
+        return None     # server_max_window_bits exige valor
+    return values
+
+def negotiate(header: str, config, stats):
+    """Sec-WebSocket-Extensions do cliente -> (PerMessageDeflate, resposta) ou (None, None)"""
+    budget = config.deflate_memory
+    for offer in header.split(','):
+        params = _parse(offer)
+        if params is None:
+            continue
+        server_bits = min(config.deflate_bits, int(params.get('server_max_window_bits') or MAX_BITS))
+        if server_bits < MIN_BITS:
+            continue
+        # Janela do cliente: só dá para reduzir se ele ofereceu client_max_window_bits
+        client_bits = MAX_BITS
+        if 'client_max_window_bits' in params:
+            client_bits = int(params['client_max_window_bits'] or MAX_BITS)
+            while client_bits > MIN_BITS and inflate_cost(client_bits) > budget:
+                client_bits -= 1
+        if inflate_cost(client_bits) > budget:
+            continue
+        shared = config.deflate_no_context or 'server_no_context_takeover' in params
+        mem_level = 8
+        if not shared:
+            room = budget - inflate_cost(client_bits)
+            fit = next(((bits, level) for bits in range(server_bits, MIN_BITS - 1, -1)
+                        for level in range(8, 0, -1) if deflate_cost(bits, level) <= room), None)
+            if fit is None:
+                shared = True
+            else:
+                server_bits, mem_level = fit
+        response = ['permessage-deflate']
+        if shared:
+            response.append('server_no_context_takeover')
+        if server_bits < MAX_BITS or 'server_max_window_bits' in params:
+            response.append(f'server_max_window_bits={server_bits}')
+        if 'client_max_window_bits' in params:
+            response.append(f'client_max_window_bits={client_bits}')
+        deflate = PerMessageDeflate(server_bits, mem_level, shared, client_bits, stats)
+        return deflate, '; '.join(response)
+    return None, None
+
+class PerMessageDeflate:
+    """Compressão de um túnel: cada leitura do destino vira uma mensagem"""
+    __slots__ = ('compressor', 'flush_mode', 'inflater', 'stats', 'skip', 'backoff',
+                 'raw_out', 'wire_out', 'wire_in', 'raw_in', 'skipped', 'cpu')
+
+    def __init__(self, server_bits: int, mem_level: int, shared: bool, client_bits: int, stats):
+        if shared:
+            self.compressor = shared_compressor(server_bits)
+            self.flush_mode = zlib.Z_FULL_FLUSH
+        else:
+            self.compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, -server_bits, mem_level)
+            self.flush_mode = zlib.Z_SYNC_FLUSH
+        self.inflater = zlib.decompressobj(-client_bits)
+        self.stats = stats      # Metrics.deflate: soma de todos os túneis
+        self.skip = 0           # mensagens que ainda vão sem comprimir
+        self.backoff = SKIP_FIRST
+        self.raw_out = self.wire_out = 0    # destino -> cliente: antes/depois
+        self.wire_in = self.raw_in = 0      # cliente -> destino: antes/depois
+        self.skipped = 0
+        self.cpu = 0.0
+        stats['tunnels'] += 1
+
+    def compress(self, data: bytes):
+        """Payload comprimido (RSV1) ou None para mandar a mensagem como está"""
+        if self.skip or len(data) < MIN_SIZE:
+            if self.skip:
+                self.skip -= 1
+            self.skipped += 1
+            self.stats['skipped'] += 1
+            return None
+        started = time.perf_counter()
+        out = self.compressor.compress(data) + self.compressor.flush(self.flush_mode)
+        spent = time.perf_counter() - started
+        if out.endswith(TAIL):
+            out = out[:-4]
+        if len(out) > len(data) * SKIP_RATIO:
+            # Já foi comprimido (e o cliente vai descomprimir); só as próximas pulam
+            self.skip = self.backoff
+            self.backoff = min(self.backoff * 2, SKIP_MAX)
+        else:
+            self.backoff = SKIP_FIRST
+        self.raw_out += len(data)
+        self.wire_out += len(out)
+        self.cpu += spent
+        stats = self.stats
+        stats['raw_out'] += len(data)
+        stats['wire_out'] += len(out)
+        stats['cpu_seconds'] += spent
+        return out
+
+    def decompress(self, data, end: bool):
+        """Payload de uma mensagem RSV1; None se passar de INFLATE_LIMIT"""
+        started = time.perf_counter()
+        inflater = self.inflater
+        out = inflater.decompress(data, INFLATE_LIMIT)
+        if end and not inflater.unconsumed_tail:
+            out += inflater.decompress(TAIL, INFLATE_LIMIT)
+        if inflater.unconsumed_tail or len(out) >= INFLATE_LIMIT:
+            return None
+        spent = time.perf_counter() - started
+        self.raw_in += len(out)
+        self.wire_in += len(data)
+        self.cpu += spent
+        stats = self.stats
+        stats['raw_in'] += len(out)
+        stats['wire_in'] += len(data)
+        stats['cpu_seconds'] += spent
+        return out
+
+    @property
+    def saved(self) -> int:
+        return self.raw_out - self.wire_out + self.raw_in - self.wire_in
+
+    def report(self) -> str:
+        raw = self.raw_out + self.raw_in
+        ratio = self.saved / raw * 100 if raw else 0.0
+        return (f"{self.saved} bytes economizados ({ratio:.1f}%), "
+                f"{self.cpu * 1000:.1f} ms de CPU, {self.skipped} mensagens sem comprimir")
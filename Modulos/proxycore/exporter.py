@@ -0,0 +1,155 @@
+# encoding: utf-8
+# SSHPLUS - Endpoint Prometheus/OpenMetrics dos proxies (-m <porta>)
+# Processo único: servidor asyncio no mesmo loop do proxy.
+# Multi-worker: o supervisor atende na própria select() e responde com a
+# soma dos snapshots que os workers enviam a cada METRICS_INTERVAL.
+
+import asyncio
+import socket
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'sshplus_proxy'
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f'# TYPE {PREFIX}_{name} counter')
+    lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+    for labels, value in samples:
+        lines.append(f'{PREFIX}_{name}_total{labels} {value}')
+
+def _gauge(lines, name, help_text, samples):
+    lines.append(f'# TYPE {PREFIX}_{name} gauge')
+    lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+    for labels, value in samples:
+        lines.append(f'{PREFIX}_{name}{labels} {value}')
+
+def _histogram(lines, name, help_text, labels, snapshot):
+    lines.append(f'# TYPE {PREFIX}_{name} histogram')
+    lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+    cumulative = 0
+    for bound, count in snapshot.get('buckets', {}).items():
+        cumulative += count
+        lines.append(f'{PREFIX}_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{PREFIX}_{name}_sum{{{labels}}} {snapshot.get("sum", 0)}')
+    lines.append(f'{PREFIX}_{name}_count{{{labels}}} {snapshot.get("count", 0)}')
+
+def render(snapshot: dict, proxy: str) -> bytes:
+    """Converte um snapshot de Metrics.log_metrics() (ou a soma dos workers)"""
+    base = f'proxy="{proxy}"'
+    lines = []
+    _counter(lines, 'connections', 'Conexões aceitas',
+             [(f'{{{base}}}', snapshot.get('total_connections', 0))])
+    _gauge(lines, 'active_connections', 'Conexões abertas',
+           [(f'{{{base}}}', snapshot.get('active_connections', 0))])
+    _gauge(lines, 'paused_connections', 'Conexões com buffer de escrita acima de WRITE_HIGH',
+           [(f'{{{base}}}', snapshot.get('paused_connections', 0))])
+    _counter(lines, 'backpressure', 'Vezes que uma conexão passou de WRITE_HIGH',
+             [(f'{{{base}}}', snapshot.get('backpressure_events', 0))])
+    _gauge(lines, 'draining', 'Processos drenando (sem aceitar conexões novas)',
+           [(f'{{{base}}}', snapshot.get('draining', 0))])
+    _counter(lines, 'bytes', 'Bytes repassados por sentido', [
+        (f'{{{base},direction="upstream"}}', snapshot.get('total_bytes_received', 0)),
+        (f'{{{base},direction="downstream"}}', snapshot.get('total_bytes_sent', 0)),
+    ])
+    _counter(lines, 'errors', 'Erros por motivo',
+             [(f'{{{base},reason="{reason}"}}', count)
+              for reason, count in sorted(snapshot.get('errors', {}).items())])
+    _counter(lines, 'dns_lookups', 'Resoluções de destino por resultado do cache',
+             [(f'{{{base},result="{result}"}}', count)
+              for result, count in snapshot.get('dns', {}).items()])
+    shaping = snapshot.get('shaping', {})
+    _counter(lines, 'shaping_pauses', 'Leituras suspensas por limite de banda',
+             [(f'{{{base}}}', shaping.get('pauses', 0))])
+    _counter(lines, 'shaping_paused_seconds', 'Tempo somado de leitura suspensa por limite de banda',
+             [(f'{{{base}}}', shaping.get('paused_seconds', 0.0))])
+    _gauge(lines, 'pool_ready', 'Conexões de reserva abertas com os destinos',
+           [(f'{{{base}}}', snapshot.get('pool_ready', 0))])
+    _counter(lines, 'pool_events', 'Retiradas e descartes do pool de destinos',
+             [(f'{{{base},event="{event}"}}', count)
+              for event, count in snapshot.get('pool', {}).items()])
+    _counter(lines, 'keepalive_pings', 'Pings enviados a túneis parados há KEEPALIVE',
+             [(f'{{{base}}}', snapshot.get('keepalive_pings', 0))])
+    deflate = snapshot.get('deflate', {})
+    _counter(lines, 'deflate_tunnels', 'Túneis WebSocket com permessage-deflate',
+             [(f'{{{base}}}', deflate.get('tunnels', 0))])
+    _counter(lines, 'deflate_saved_bytes', 'Bytes economizados pela compressão por sentido', [
+        (f'{{{base},direction="upstream"}}', deflate.get('raw_in', 0) - deflate.get('wire_in', 0)),
+        (f'{{{base},direction="downstream"}}', deflate.get('raw_out', 0) - deflate.get('wire_out', 0)),
+    ])
+    _counter(lines, 'deflate_skipped', 'Mensagens enviadas sem comprimir',
+             [(f'{{{base}}}', deflate.get('skipped', 0))])
+    _counter(lines, 'deflate_cpu_seconds', 'Tempo gasto no zlib',
+             [(f'{{{base}}}', deflate.get('cpu_seconds', 0.0))])
+    _histogram(lines, 'handshake_seconds', 'Accept até headers completos',
+               base, snapshot.get('handshake_latency', {}))
+    _histogram(lines, 'connect_seconds', 'Headers até destino conectado',
+               base, snapshot.get('connect_latency', {}))
+    _histogram(lines, 'first_byte_seconds', 'Destino conectado até o primeiro byte de volta',
+               base, snapshot.get('first_byte_latency', {}))
+    _gauge(lines, 'idle_tunnels', 'Túneis por faixa de inatividade',
+           [(f'{{{base},idle="{idle}"}}', count)
+            for idle, count in snapshot.get('idle_buckets', {}).items()])
+    _gauge(lines, 'buffers', 'Pipes por tamanho atual do AdaptiveBuffer',
+           [(f'{{{base},direction="{direction}",size="{size}"}}', count)
+            for direction, sizes in snapshot.get('buffer_sizes', {}).items()
+            for size, count in sorted(sizes.items(), key=lambda item: int(item[0]))])
+    if 'workers' in snapshot:
+        _gauge(lines, 'workers', 'Workers vivos', [(f'{{{base}}}', snapshot['workers'])])
+    lines.append('# EOF\n')
+    return '\n'.join(lines).encode()
+
+def response(request: bytes, collect, proxy: str) -> bytes:
+    """Resposta HTTP/1.0 para GET /metrics; o resto é 404"""
+    parts = request.split(b' ', 2)
+    if len(parts) < 2 or parts[0] != b'GET' or parts[1].split(b'?')[0] not in (b'/metrics', b'/'):
+        return b'HTTP/1.0 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+    body = render(collect(), proxy)
+    head = (f'HTTP/1.0 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n')
+    return head.encode() + body
+
+async def start_metrics_server(host: str, port: int, collect, proxy: str) -> asyncio.AbstractServer:
+    """Listener asyncio do modo de processo único"""
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=5)
+            writer.write(response(request, collect, proxy))
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # reuse_port: durante a troca de versão (-u) o antigo e o novo atendem juntos
+    return await asyncio.start_server(handle, host, port, reuse_address=True, reuse_port=True)
+
+class MetricsListener:
+    """Listener bloqueante curto, atendido na select() do supervisor"""
+    def __init__(self, host: str, port: int, proxy: str):
+        self.proxy = proxy
+        self.sock = socket.create_server((host, port), reuse_port=True)
+        self.sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def serve(self, collect):
+        try:
+            conn, _ = self.sock.accept()
+        except BlockingIOError:
+            return
+        with conn:
+            conn.settimeout(0.5)
+            try:
+                request = b''
+                while b'\r\n\r\n' not in request and len(request) < 8192:
+                    data = conn.recv(4096)
+                    if not data:
+                        return
+                    request += data
+                conn.sendall(response(request, collect, self.proxy))
+            except OSError:
+                pass
+
+    def close(self):
+        self.sock.close()
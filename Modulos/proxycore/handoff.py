@@ -0,0 +1,156 @@
+# encoding: utf-8
+# SSHPLUS - Troca de versão sem derrubar clientes (-u)
+# O processo novo conecta no socket Unix do antigo e recebe os listeners por
+# SCM_RIGHTS. A fila de accept é a mesma no kernel: nada se perde entre um e
+# outro. Depois do OK do novo, o antigo para de aceitar e drena os túneis.
+
+import os
+import socket
+
+RUN_DIR = '/run/sshplus'
+TIMEOUT = 10.0
+MAX_FDS = 64
+HELLO = b'SSHPLUS'
+BACKLOG = 100   # o mesmo padrão do asyncio.start_server
+
+def handoff_path(config) -> str:
+    return os.path.join(RUN_DIR, f'{config.label}-{config.port}.sock')
+
+def pid_path(config) -> str:
+    return os.path.join(RUN_DIR, f'{config.label}-{config.port}.pid')
+
+def write_pid(config):
+    """PID do supervisor (ou do processo único) para o kill -HUP do menu; None se falhar"""
+    path = pid_path(config)
+    try:
+        os.makedirs(RUN_DIR, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            f.write(f'{os.getpid()}\n')
+        os.replace(f'{path}.tmp', path)
+    except OSError:
+        return None
+    return path
+
+def remove_pid(path):
+    """Só apaga se ainda for nosso: com -u o processo novo já regravou o arquivo"""
+    if path is None:
+        return
+    try:
+        with open(path) as f:
+            if f.read().strip() == str(os.getpid()):
+                os.unlink(path)
+    except (OSError, ValueError):
+        pass
+
+def listen(config, count: int = 1) -> list:
+    """Listeners novos com SO_REUSEPORT (um por worker)"""
+    return [socket.create_server((config.host, config.port), backlog=BACKLOG,
+                                 reuse_port=True) for _ in range(count)]
+
+def takeover(path: str):
+    """Recebe os listeners do processo em execução: (conexão, [sockets]) ou None"""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(TIMEOUT)
+    try:
+        conn.connect(path)
+        msg, fds, _, _ = socket.recv_fds(conn, len(HELLO), MAX_FDS)
+    except OSError:
+        conn.close()
+        return None
+    if msg != HELLO or not fds:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+        return None
+    return conn, [socket.socket(fileno=fd) for fd in fds]
+
+def confirm(conn):
+    """Avisa o processo antigo que já aceitamos; ele some com o socket Unix e fecha"""
+    try:
+        conn.sendall(b'OK')
+        while conn.recv(64):
+            pass
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+class HandoffListener:
+    """Socket Unix que entrega os listeners à versão nova (lado antigo)"""
+    def __init__(self, path: str, sockets: list):
+        self.path = path
+        self.fds = [s.fileno() for s in sockets]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            os.unlink(path)     # sobra de um processo que morreu sem limpar
+        else:
+            raise OSError(f'{path} pertence a outro processo em execução')
+        finally:
+            probe.close()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        os.chmod(path, 0o600)
+        self.sock.listen(1)
+        self.sock.setblocking(False)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def accept(self):
+        try:
+            conn, _ = self.sock.accept()
+        except BlockingIOError:
+            return None
+        return conn
+
+    def send(self, conn):
+        socket.send_fds(conn, [HELLO], self.fds)
+
+    def serve(self) -> bool:
+        """Versão bloqueante (supervisor); True se o novo processo assumiu"""
+        conn = self.accept()
+        if conn is None:
+            return False
+        with conn:
+            conn.settimeout(TIMEOUT)
+            try:
+                self.send(conn)
+                ok = conn.recv(2) == b'OK'
+            except OSError:
+                ok = False
+            if ok:
+                self.close()
+        return ok
+
+    async def serve_async(self, loop) -> bool:
+        """Versão do event loop (processo único): não trava os túneis"""
+        import asyncio
+        conn = self.accept()
+        if conn is None:
+            return False
+        with conn:
+            conn.setblocking(False)
+            try:
+                self.send(conn)
+                ok = await asyncio.wait_for(loop.sock_recv(conn, 2), TIMEOUT) == b'OK'
+            except (OSError, asyncio.TimeoutError):
+                ok = False
+            if ok:
+                self.close()
+        return ok
+
+    def close(self, unlink: bool = True):
+        """unlink=False nos filhos do fork: o caminho continua do supervisor"""
+        if self.sock.fileno() < 0:
+            return
+        if unlink:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        self.sock.close()
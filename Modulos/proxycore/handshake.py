@@ -0,0 +1,175 @@
+# encoding: utf-8
+# SSHPLUS - Handshake HTTP dos proxies (X-Real-Host, X-Split, X-Pass)
+
+import re
+from typing import Dict, Optional, Tuple
+
+# Linha de requisição completa ("CONNECT host:porta HTTP/1.1") e o começo de uma
+# ainda incompleta; qualquer outra coisa (ex.: "SSH-2.0-...") já é dado do túnel.
+# Tolerante como os payloads de injector: método em minúsculas, espaço no
+# alvo e linhas terminadas só em LF ([lf]). Só o primeiro bloco pode chegar
+# cortado antes do espaço depois do método.
+_REQUEST_LINE = re.compile(rb'[A-Za-z]+ [^\r\n]* HTTP/\d\.\d\r?\n')
+_FIRST_PREFIX = re.compile(rb'[A-Za-z]+(?: [^\r\n]*)?\r?\Z')
+_NEXT_PREFIX = re.compile(rb'[A-Za-z]+ [^\r\n]*\r?\Z')
+# Headers do proxy: um bloco fora do formato que traga algum deles ainda é
+# handshake (como no find_header, que os achava em qualquer parte da leitura)
+_KNOWN_HEADERS = (b'x-real-host:', b'x-split:', b'x-pass:')
+
+def find_header(data: bytes, header: bytes) -> Optional[bytes]:
+    """Busca header nos dados"""
+    header_start = data.find(header + b': ')
+    if header_start == -1:
+        return None
+
+    value_start = header_start + len(header) + 2
+    value_end = data.find(b'\r\n', value_start)
+
+    if value_end == -1:
+        return None
+
+    return data[value_start:value_end]
+
+def split_host_port(path: str, default_port: int) -> Tuple[str, int]:
+    """'host:porta' -> (host, porta); sem porta usa a padrão do perfil"""
+    if ':' in path:
+        host, port = path.rsplit(':', 1)
+        return host, int(port)
+    return path, default_port
+
+def password_ok(passwd: Optional[bytes], password: str) -> bool:
+    """Sem PASS configurado qualquer cliente passa; senão X-Pass deve coincidir"""
+    if len(password) == 0:
+        return True
+    return passwd is not None and passwd.decode() == password
+
+class HeaderTooLarge(Exception):
+    """Handshake passou do limite de bytes do perfil"""
+
+def _starts_request(data, first: bool) -> Optional[bool]:
+    """True/False se os dados começam (ou não) com uma requisição HTTP; None se faltam bytes"""
+    line_end = data.find(b'\n')
+    if line_end == -1:
+        prefix = _FIRST_PREFIX if first else _NEXT_PREFIX
+        return None if prefix.match(data) else False
+    return _REQUEST_LINE.match(data, 0, line_end + 1) is not None
+
+def _blank_line(data, start: int):
+    """(fim dos headers, início do resto) da primeira linha em branco, CRLF ou LF"""
+    crlf = data.find(b'\n\r\n', start)
+    lf = data.find(b'\n\n', start, None if crlf == -1 else crlf)
+    if lf != -1:
+        return lf, lf + 2
+    if crlf != -1:
+        return crlf, crlf + 3
+    return None
+
+def _has_known_header(data, end: int) -> bool:
+    head = bytes(data[:end]).lower()
+    return any(name in head for name in _KNOWN_HEADERS)
+
+class HeaderParser:
+    """Parser incremental do handshake
+
+    Acumula o que chega até cada linha em branco sem reler o que já foi varrido,
+    separa todos os headers de uma vez num dict (nome em minúsculas) e
+    consome também as requisições seguidas que os injectors mandam no mesmo
+    payload. Um bloco com X-Split faz esperar pelo bloco seguinte em vez de
+    descartar uma leitura qualquer. O que sobra depois do handshake fica em
+    payload e vai direto para o túnel.
+    """
+    __slots__ = ('limit', 'headers', 'blocks', 'size', '_buffer', '_scan', '_split')
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.headers: Dict[bytes, bytes] = {}
+        self.blocks = 0
+        self.size = 0
+        self._buffer = bytearray()
+        self._scan = 0
+        self._split = False
+
+    @property
+    def payload(self) -> bytes:
+        return bytes(self._buffer)
+
+    def get(self, name: bytes) -> Optional[bytes]:
+        return self.headers.get(name)
+
+    def feed(self, data) -> bool:
+        """Adiciona bytes recebidos; True quando o handshake terminou"""
+        self.size += len(data)
+        if self.size > self.limit:
+            raise HeaderTooLarge(self.size)
+        self._buffer += data
+        return self._parse()
+
+    def _parse(self) -> bool:
+        buffer = self._buffer
+        while buffer:
+            if buffer[0] in b'\r\n' and not self._strip_newlines(buffer):
+                return self.blocks > 0 and not self._split
+            blank = _blank_line(buffer, self._scan)
+            if blank is None:
+                request = _starts_request(buffer, not self.blocks)
+                if self._split and request is False:
+                    # Bloco do X-Split sem formato HTTP: descartado como chegou
+                    buffer.clear()
+                    self._split = False
+                    break
+                if request is False and (self.blocks or not _has_known_header(buffer, len(buffer))):
+                    return True
+                self._scan = max(len(buffer) - 3, 0)
+                return False
+            end, rest = blank
+            if self._split or _REQUEST_LINE.match(buffer):
+                self._add_block(buffer, end, 1)
+            elif _has_known_header(buffer, end):
+                # Começo irreconhecível, mas com os headers do proxy: vale o bloco
+                self._add_block(buffer, end, 0)
+            else:
+                return True
+            del buffer[:rest]
+            self._scan = 0
+        return self.blocks > 0 and not self._split
+
+    def _strip_newlines(self, buffer) -> bool:
+        """Tira o CR/LF antes de um bloco ([crlf] dos payloads); False se só havia isso
+
+        Depois do primeiro bloco só tira se vier outra requisição em seguida,
+        para não comer bytes do túnel.
+        """
+        rest = len(buffer.lstrip(b'\r\n'))
+        lead = len(buffer) - rest
+        if rest and self.blocks and not self._split \
+                and _starts_request(buffer[lead:], False) is False:
+            return True
+        del buffer[:lead]
+        self._scan = 0
+        return rest > 0
+
+    def _add_block(self, buffer, end: int, skip: int):
+        self.blocks += 1
+        headers = self.headers
+        split = False
+        for line in bytes(buffer[:end]).splitlines()[skip:]:
+            name, sep, value = line.partition(b':')
+            if not sep:
+                continue
+            name = name.strip().lower()
+            if name == b'x-split':
+                split = True
+            # Como find_header: vale a primeira ocorrência de cada header
+            if name not in headers:
+                headers[name] = value.strip()
+        # O bloco que responde a um X-Split não pede outro, a menos que traga o seu
+        self._split = split
+
+async def read_handshake(reader, parser: HeaderParser) -> bool:
+    """Lê do StreamReader até o fim do handshake; False se o cliente fechou antes"""
+    while True:
+        data = await reader.read(parser.limit)
+        if not data:
+            return False
+        if parser.feed(data):
+            return True
@@ -0,0 +1,62 @@
+# encoding: utf-8
+# SSHPLUS - Auto-ping dos túneis com um único agendador por loop
+# Em vez de uma task dormindo KEEPALIVE segundos por conexão, os túneis ficam
+# distribuídos em fatias; um timer por loop visita uma fatia por tick, de modo
+# que cada túnel é visto uma vez por intervalo, e só recebe ping quem está
+# parado (sem tráfego nem ping) há um intervalo. Túnel fechado sai na hora.
+
+import asyncio
+
+PING = b'\x89\x00'  # frame WebSocket de ping sem payload
+
+class Heartbeat:
+    """`slices` fatias cobrindo um intervalo de KEEPALIVE
+
+    Entradas são objetos com last_activity (loop.time()), pinged e ping().
+    As fatias são preenchidas em rodízio, então cada tick trata cerca de
+    1/slices dos túneis.
+    """
+    def __init__(self, interval: float, slices: int = 30):
+        self.interval = interval
+        self.slices = slices
+        self.tick = interval / slices
+        self.loop = None
+        self._slots = [set() for _ in range(slices)]
+        self._where = {}    # entrada -> fatia
+        self._cursor = 0    # próxima fatia a visitar
+        self._handle = None
+        self.pings = 0
+
+    def __len__(self):
+        return len(self._where)
+
+    def add(self, conn):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        conn.pinged = 0.0
+        # A fatia recém-visitada: a primeira visita vem um intervalo depois
+        slot = (self._cursor - 1) % self.slices
+        self._slots[slot].add(conn)
+        self._where[conn] = slot
+        if self._handle is None:
+            self._handle = self.loop.call_later(self.tick, self._run)
+
+    def discard(self, conn):
+        slot = self._where.pop(conn, None)
+        if slot is not None:
+            self._slots[slot].discard(conn)
+
+    def _run(self):
+        now = self.loop.time()
+        # Folga de um tick: a visita pode chegar um pouco antes do intervalo
+        limit = now - self.interval + self.tick
+        for conn in list(self._slots[self._cursor]):
+            if max(conn.last_activity, conn.pinged) <= limit:
+                conn.pinged = now
+                if conn.ping():
+                    self.pings += 1
+        self._cursor = (self._cursor + 1) % self.slices
+        if self._where:
+            self._handle = self.loop.call_later(self.tick, self._run)
+        else:
+            self._handle = None
@@ -0,0 +1,118 @@
+# encoding: utf-8
+# SSHPLUS - Timeout de inatividade dos túneis com uma roda de tempo por loop
+# Cada túnel só anota last_activity a cada leitura; um único timer por loop
+# percorre a roda e fecha quem passou de TIMEOUT sem tráfego, em vez de um
+# asyncio.wait_for (task + timer) por leitura, por sentido, por conexão.
+
+import asyncio
+
+class IdleWheel:
+    """Hashed timing wheel de `slots` posições cobrindo um TIMEOUT
+
+    Entradas são objetos com last_activity (loop.time()) e expire(). Atividade
+    não mexe na roda: ao chegar na posição, quem teve tráfego é recolocado
+    pelo novo prazo e quem não teve é expirado (no máximo um tick atrasado).
+    """
+    def __init__(self, timeout: float, slots: int = 60, buckets: int = 6):
+        self.timeout = timeout
+        self.slots = slots
+        self.tick = timeout / slots
+        self.buckets = buckets
+        self.loop = None
+        self._wheel = [set() for _ in range(slots)]
+        self._where = {}    # entrada -> posição atual na roda
+        self._cursor = 0    # próximo tick absoluto a processar
+        self._handle = None
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._where)
+
+    def add(self, conn):
+        """Começa a vigiar uma conexão; last_activity passa a ser agora"""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        now = self.loop.time()
+        conn.last_activity = now
+        if self._handle is None:
+            self._cursor = int(now / self.tick)
+            self._handle = self.loop.call_at((self._cursor + 1) * self.tick, self._run)
+        self._place(conn, now + self.timeout)
+
+    def set_timeout(self, timeout: float):
+        """Novo TIMEOUT (SIGHUP): recalcula o tick e recoloca todas as entradas"""
+        entries = list(self._where)
+        self.timeout = timeout
+        self.tick = timeout / self.slots
+        self._wheel = [set() for _ in range(self.slots)]
+        self._where = {}
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not entries:
+            return
+        now = self.loop.time()
+        self._cursor = int(now / self.tick)
+        self._handle = self.loop.call_at((self._cursor + 1) * self.tick, self._run)
+        first = (self._cursor + 1) * self.tick   # prazos já vencidos: no próximo tick
+        for conn in entries:
+            self._place(conn, max(conn.last_activity + timeout, first))
+
+    def close_all(self) -> int:
+        """Fim da drenagem: expira todas as entradas de uma vez; devolve quantas"""
+        entries = list(self._where)
+        self._wheel = [set() for _ in range(self.slots)]
+        self._where = {}
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for conn in entries:
+            conn.expire()
+        return len(entries)
+
+    def discard(self, conn):
+        slot = self._where.pop(conn, None)
+        if slot is not None:
+            self._wheel[slot].discard(conn)
+
+    def _place(self, conn, deadline: float):
+        slot = int(deadline / self.tick) % self.slots
+        self._wheel[slot].add(conn)
+        self._where[conn] = slot
+
+    def _run(self):
+        now = self.loop.time()
+        limit = now - self.timeout
+        # Processa só ticks cujo intervalo já passou inteiro
+        while (self._cursor + 1) * self.tick <= now:
+            slot = self._cursor % self.slots
+            bucket = self._wheel[slot]
+            if bucket:
+                self._wheel[slot] = set()
+                for conn in bucket:
+                    if conn not in self._where:
+                        continue    # removida por expire() de outra entrada
+                    if conn.last_activity <= limit:
+                        del self._where[conn]
+                        self.expired += 1
+                        conn.expire()
+                    else:
+                        self._place(conn, conn.last_activity + self.timeout)
+            self._cursor += 1
+
+        if self._where:
+            self._handle = self.loop.call_at((self._cursor + 1) * self.tick, self._run)
+        else:
+            self._handle = None
+
+    def idle_buckets(self) -> dict:
+        """Conexões por faixa de inatividade ('0-10s', '10-20s', ...)"""
+        width = self.timeout / self.buckets
+        counts = [0] * self.buckets
+        if self._where:
+            now = self.loop.time()
+            last = self.buckets - 1
+            for conn in self._where:
+                index = int((now - conn.last_activity) / width)
+                counts[index if index < last else last] += 1
+        return {f'{i * width:.3g}-{(i + 1) * width:.3g}s': n for i, n in enumerate(counts)}
@@ -0,0 +1,157 @@
+# encoding: utf-8
+# SSHPLUS - Métricas dos proxies
+# Tudo roda no event loop de um único processo: os contadores são atributos
+# simples, sem lock. No modo multi-worker cada worker envia o próprio
+# snapshot (log_metrics) e o supervisor soma.
+
+# Histograma log-linear (estilo HDR) em microssegundos: valores abaixo de
+# 2*SUB caem em buckets exatos; acima, cada oitava (potência de 2) tem SUB
+# buckets, erro relativo máximo 1/SUB. Registrar é O(1): bit_length e shift.
+SUB_BITS = 3
+SUB = 1 << SUB_BITS
+MAX_BITS = 25                       # 2^25 us ~ 33 s; acima vai para o último bucket
+MAX_US = (1 << MAX_BITS) - 1
+SIZE = (MAX_BITS - SUB_BITS + 1) * SUB
+# Limites exportados (OpenMetrics/workers): oitavas de 128 us a ~16.8 s,
+# que coincidem com bordas dos buckets finos e por isso somam sem erro.
+EXPORT_BITS = range(7, 25)
+
+def _index(us: int) -> int:
+    shift = us.bit_length() - SUB_BITS - 1
+    if shift <= 0:
+        return us
+    return shift * SUB + (us >> shift)
+
+def _upper(index: int) -> int:
+    """Limite superior (exclusivo, em us) do bucket fino"""
+    if index < 2 * SUB:
+        return index + 1
+    shift = index // SUB - 1
+    return (index - shift * SUB + 1) << shift
+
+class Histogram:
+    """Histograma de buckets fixos; observe() não cria listas nem dicts"""
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * SIZE
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        us = int(value * 1000000)
+        if us > MAX_US:
+            us = MAX_US
+        elif us < 0:
+            us = 0
+        shift = us.bit_length() - SUB_BITS - 1
+        self.counts[us if shift <= 0 else shift * SUB + (us >> shift)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Valor (s) abaixo do qual está a fração q das amostras"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(_upper(index) / 1000000, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Buckets por oitava (contagem não acumulada), soma e total"""
+        buckets = {}
+        start = 0
+        for bits in EXPORT_BITS:
+            end = _index(1 << bits)
+            buckets[f'{(1 << bits) / 1000000:g}'] = sum(self.counts[start:end])
+            start = end
+        buckets['+Inf'] = sum(self.counts[start:])
+        return {'buckets': buckets, 'sum': self.sum, 'count': self.count}
+
+    def stats(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+class Metrics:
+    """Contadores do proxy, os mesmos para os três perfis"""
+    def __init__(self):
+        self.total_connections = 0
+        self.active_connections = 0
+        self.paused_connections = 0     # buffer de escrita acima de WRITE_HIGH agora
+        self.backpressure_events = 0    # vezes que uma conexão passou de WRITE_HIGH
+        self.total_bytes_sent = 0       # destino -> cliente (downstream)
+        self.total_bytes_received = 0   # cliente -> destino (upstream)
+        # Distribuição dos tamanhos atuais do AdaptiveBuffer por sentido
+        self.buffer_sizes = {'upstream': {}, 'downstream': {}}
+        self.idle = None  # IdleWheel do loop: túneis por faixa de inatividade
+        self.dns = None   # DNSCache dos destinos: hits/misses
+        self.shaping = None  # Shaper: pausas de leitura por limite de banda
+        self.heartbeat = None  # Heartbeat do loop (perfis com keepalive): pings enviados
+        self.pool = None       # ConnectionPool (perfis com pool): reservas e retiradas
+        # permessage-deflate do wsproxy.py: bytes antes (raw) e depois (wire) da
+        # compressão por sentido, mensagens que foram sem comprimir e tempo de zlib
+        self.deflate = {'tunnels': 0, 'raw_out': 0, 'wire_out': 0, 'raw_in': 0,
+                        'wire_in': 0, 'skipped': 0, 'cpu_seconds': 0.0}
+        self.handshake_latency = Histogram()  # accept -> headers completos
+        self.connect_latency = Histogram()    # headers -> destino conectado
+        self.first_byte_latency = Histogram() # destino conectado -> 1º byte de volta
+        self.errors = {}                      # motivo -> ocorrências
+        self.draining = 0                     # 1 depois do SIGTERM: não aceita mais
+
+    def error(self, reason: str):
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def latency_stats(self) -> dict:
+        """Percentis (s) de cada etapa da conexão"""
+        return {
+            'handshake': self.handshake_latency.stats(),
+            'connect': self.connect_latency.stats(),
+            'first_byte': self.first_byte_latency.stats(),
+        }
+
+    def dump_latency(self, prefix: str = ''):
+        """Tabela de latências (ms) no stdout; usado no SIGUSR1"""
+        print(f"\033[1;36m{prefix}{'etapa':<12}{'n':>8}{'média':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'máx':>9}\033[0m")
+        for stage, st in self.latency_stats().items():
+            print(f"{prefix}{stage:<12}{st['count']:>8}" + ''.join(
+                f"{st[key] * 1000:>9.2f}" for key in ('mean', 'p50', 'p90', 'p99', 'max')))
+
+    def log_metrics(self):
+        """Log estruturado de métricas"""
+        errors = dict(self.errors)
+        if self.idle is not None and self.idle.expired:
+            errors['idle_timeout'] = self.idle.expired
+        return {
+            'total_connections': self.total_connections,
+            'active_connections': self.active_connections,
+            'draining': self.draining,
+            'paused_connections': self.paused_connections,
+            'backpressure_events': self.backpressure_events,
+            'total_bytes_sent': self.total_bytes_sent,
+            'total_bytes_received': self.total_bytes_received,
+            'buffer_sizes': self.buffer_sizes,
+            'idle_buckets': self.idle.idle_buckets() if self.idle is not None else {},
+            'handshake_latency': self.handshake_latency.snapshot(),
+            'connect_latency': self.connect_latency.snapshot(),
+            'first_byte_latency': self.first_byte_latency.snapshot(),
+            'errors': errors,
+            'dns': dict(self.dns.stats) if self.dns is not None else {},
+            'shaping': dict(self.shaping.stats) if self.shaping is not None else {},
+            'deflate': dict(self.deflate),
+            'keepalive_pings': self.heartbeat.pings if self.heartbeat is not None else 0,
+            'pool': dict(self.pool.stats) if self.pool is not None else {},
+            'pool_ready': len(self.pool) if self.pool is not None else 0
+        }
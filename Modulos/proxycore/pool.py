@@ -0,0 +1,150 @@
+# encoding: utf-8
+# SSHPLUS - Pool de conexões com o destino (perfil HTTP)
+# Conexões abertas antes de o cliente pedir: cada destino (ip, porta) já usado
+# mantém POOL_WARM sockets conectados de reserva e cada retirada dispara a
+# reposição em segundo plano, então o dial sai do caminho do handshake. Um
+# socket entregue a um túnel nunca volta ao pool. Reservas paradas há mais de
+# POOL_IDLE são fechadas (o sshd derruba quem não autentica no LoginGraceTime)
+# e POOL_MAX limita o total, descartando a reserva mais antiga.
+#
+# Opcional (POOL_WARM=0 por padrão): cada reserva é uma conexão que ainda não
+# autenticou. Cada worker (um por CPU) mantém as suas, e no sshd elas ocupam
+# vagas do MaxStartups (10:30:100: a partir de 10 o sshd começa a recusar
+# conexões novas) e viram "Timeout before authentication" no auth.log ao
+# expirar; no dropbear cada reserva é um processo filho, contado pelo
+# onlineapp e pelo droplimiter. Antes de ligar, some workers x POOL_WARM x
+# destinos e deixe esse total bem abaixo do MaxStartups (ou aumente-o), com
+# POOL_IDLE menor que o LoginGraceTime.
+
+import asyncio
+import socket
+from collections import OrderedDict, deque
+
+DIAL_TIMEOUT = 10.0
+TCP_ESTABLISHED = 1     # tcpi_state do TCP_INFO (linux/tcp_states.h)
+
+def alive(sock: socket.socket) -> bool:
+    """Reserva ainda conectada: o destino não fechou nem resetou"""
+    if hasattr(socket, 'TCP_INFO'):
+        try:
+            return sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, 1)[0] == TCP_ESTABLISHED
+        except OSError:
+            return False
+    try:
+        # Banner (SSH-2.0-...) esperando conta como vivo; b'' é FIN
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) != b''
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+
+class ConnectionPool:
+    """Reservas de conexão por destino, sem lock (um loop, retiradas síncronas)"""
+    def __init__(self, config):
+        self.config = config        # POOL_WARM/POOL_MAX/POOL_IDLE lidos a cada uso
+        self.loop = None
+        self._ready = {}            # (ip, porta) -> deque de sockets conectados
+        self._idle = OrderedDict()  # socket -> ((ip, porta), loop.time() da conexão), mais antigo primeiro
+        self._dialing = {}          # (ip, porta) -> dials em andamento
+        self._sweep = None
+        self.closed = False
+        self.stats = {'hits': 0, 'misses': 0, 'dead': 0, 'evicted': 0, 'dial_errors': 0}
+
+    def __len__(self):
+        return len(self._idle)
+
+    async def get_connection(self, host: str, port: int):
+        """Conexão para o túnel (host já resolvido pelo DNSCache); nunca reutilizada depois"""
+        sock = self.take(host, port)
+        if sock is None:
+            return await asyncio.open_connection(host, port)
+        return await asyncio.open_connection(sock=sock)
+
+    def take(self, host: str, port: int):
+        """Reserva conectada para (ip, porta) ou None; em ambos os casos repõe
+
+        Usado direto pelo core 'protocol' (loop.create_connection(sock=...)).
+        """
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        key = (host, port)
+        ready = self._ready.get(key)
+        sock = None
+        while ready:
+            candidate = ready.popleft()
+            del self._idle[candidate]
+            if alive(candidate):
+                sock = candidate
+                break
+            self.stats['dead'] += 1
+            candidate.close()
+        self._refill(key)
+        self.stats['misses' if sock is None else 'hits'] += 1
+        return sock
+
+    def close(self):
+        """Drenagem: fecha as reservas e para de repor"""
+        self.closed = True
+        if self._sweep is not None:
+            self._sweep.cancel()
+            self._sweep = None
+        for sock in self._idle:
+            sock.close()
+        self._idle.clear()
+        self._ready.clear()
+
+    def _refill(self, key):
+        missing = self.config.pool_warm - len(self._ready.get(key, ())) - self._dialing.get(key, 0)
+        for _ in range(max(missing, 0)):
+            self._dialing[key] = self._dialing.get(key, 0) + 1
+            self.loop.create_task(self._dial(key))
+
+    async def _dial(self, key):
+        host, port = key
+        sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await asyncio.wait_for(self.loop.sock_connect(sock, key), DIAL_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            # Sem nova reposição aqui: a próxima retirada tenta de novo
+            self.stats['dial_errors'] += 1
+            sock.close()
+            return
+        finally:
+            self._dialing[key] -= 1
+            if not self._dialing[key]:
+                del self._dialing[key]
+        if self.closed:
+            sock.close()
+            return
+        while len(self._idle) >= self.config.pool_max:
+            if not self._idle:
+                sock.close()
+                return
+            self._evict(next(iter(self._idle)))
+        self._ready.setdefault(key, deque()).append(sock)
+        self._idle[sock] = (key, self.loop.time())
+        if self._sweep is None:
+            self._sweep = self.loop.call_later(self.config.pool_idle / 2, self._expire)
+
+    def _evict(self, sock):
+        key, _ = self._idle.pop(sock)
+        ready = self._ready[key]
+        ready.remove(sock)
+        if not ready:
+            del self._ready[key]
+        self.stats['evicted'] += 1
+        sock.close()
+
+    def _expire(self):
+        """Fecha as reservas paradas há mais de POOL_IDLE (as mais antigas vêm primeiro)"""
+        limit = self.loop.time() - self.config.pool_idle
+        while self._idle:
+            sock, (_, since) = next(iter(self._idle.items()))
+            if since > limit:
+                break
+            self._evict(sock)
+        if self._idle:
+            self._sweep = self.loop.call_later(self.config.pool_idle / 2, self._expire)
+        else:
+            self._sweep = None
@@ -0,0 +1,290 @@
+# encoding: utf-8
+# SSHPLUS - Núcleo de túnel com asyncio.BufferedProtocol
+# Alternativa ao par StreamReader/StreamWriter: recebe em buffers
+# pré-alocados (recv_into), repassa com transport.write e trata
+# backpressure com pause_reading/resume_reading em vez de drain().
+
+import asyncio
+
+from .handshake import HeaderParser, HeaderTooLarge, split_host_port, password_ok
+from .heartbeat import PING
+from .idle import IdleWheel
+from .metrics import Metrics
+from .resolver import DNSCache, open_connection
+from .shaping import Shaper
+
+HEADERS, CONNECTING, RELAY = range(3)
+# Motivos para a leitura de um lado estar suspensa
+BACKPRESSURE, SHAPING = 1, 2
+
+class _Endpoint(asyncio.BufferedProtocol):
+    """Lado de um túnel com buffer de recepção próprio e reutilizado"""
+    transport = None
+    peer = None
+    stats = None
+    write_paused = False    # nosso buffer de escrita está acima de WRITE_HIGH
+    blocked = 0         # BACKPRESSURE | SHAPING
+    take = None         # Limits.upload/download quando há limite de banda
+    throttle = None     # TimerHandle enquanto o limite de banda segura a leitura
+
+    def alloc(self, size: int):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def forward(self, nbytes: int, now: float):
+        dst = self.peer.transport
+        dst.write(self.view[:nbytes])
+        if dst.get_write_buffer_size():
+            # O transporte pode manter referência à sobra; não reutiliza esse buffer
+            self.alloc(len(self.buffer))
+        if self.take is not None:
+            wait = self.take(nbytes, now)
+            if wait:
+                self.block(SHAPING)
+                self.throttle = self.loop.call_later(wait, self.unthrottle)
+
+    def unthrottle(self):
+        self.throttle = None
+        self.unblock(SHAPING)
+
+    def block(self, reason: int):
+        if not self.blocked:
+            self.transport.pause_reading()
+        self.blocked |= reason
+
+    def unblock(self, reason: int):
+        if self.blocked & reason:
+            self.blocked &= ~reason
+            if not self.blocked and not self.transport.is_closing():
+                self.transport.resume_reading()
+
+    def pause_writing(self):
+        self.write_paused = True
+        self.stats.paused_connections += 1
+        self.stats.backpressure_events += 1
+        if self.peer and self.peer.transport:
+            self.peer.block(BACKPRESSURE)
+
+    def resume_writing(self):
+        if not self.write_paused:
+            return      # já descontado no close(); o transporte ainda esvaziava
+        self.write_paused = False
+        self.stats.paused_connections -= 1
+        if self.peer and self.peer.transport:
+            self.peer.unblock(BACKPRESSURE)
+
+    def set_limits(self, config):
+        self.transport.set_write_buffer_limits(config.write_high, config.write_low)
+
+class TargetProtocol(_Endpoint):
+    """Conexão com o destino (SSH/OpenVPN) de um túnel"""
+    def __init__(self, client):
+        self.client = client
+        self.peer = client
+        self.loop = client.loop
+        self.stats = client.server.stats
+        self.alloc(client.server.config.chunk)
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # Antes de qualquer byte do destino: a resposta do handshake vai primeiro
+        self.client.target_connected(self)
+
+    def get_buffer(self, sizehint):
+        return self.view
+
+    def buffer_updated(self, nbytes):
+        client = self.client
+        client.last_activity = now = client.loop.time()
+        if client.waiting_first:
+            client.waiting_first = False
+            client.server.stats.first_byte_latency.observe(now - client.connected)
+        client.server.stats.total_bytes_sent += nbytes
+        self.forward(nbytes, now)
+
+    def eof_received(self):
+        self.client.close()
+
+    def connection_lost(self, exc):
+        self.client.close()
+
+class ClientProtocol(_Endpoint):
+    """Conexão do cliente: handshake HTTP e depois relay para o destino"""
+    def __init__(self, server):
+        self.server = server
+        self.config = server.config
+        self.loop = server.loop
+        self.stats = server.stats
+        self.state = HEADERS
+        self.closed = False
+        self.addr = None
+        self.parser = HeaderParser(self.config.buflen)
+        self.last_activity = 0.0
+        self.accepted = self._connect_started = self.connected = 0.0
+        self.waiting_first = False
+        self.limits = None
+        self._timer = None
+        self._connect_task = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.addr = transport.get_extra_info('peername')
+        self.server.stats.total_connections += 1
+        self.server.stats.active_connections += 1
+        self.accepted = self.loop.time()
+        self._timer = self.loop.call_later(self.config.handshake_timeout, self._handshake_timeout)
+
+    def get_buffer(self, sizehint):
+        if self.state == RELAY:
+            return self.view
+        # Handshake é processado de forma síncrona: um buffer por servidor basta
+        return self.server.handshake_view
+
+    def buffer_updated(self, nbytes):
+        if self.state == RELAY:
+            self.last_activity = now = self.loop.time()
+            self.server.stats.total_bytes_received += nbytes
+            self.forward(nbytes, now)
+        elif self.state == HEADERS:
+            try:
+                done = self.parser.feed(self.server.handshake_view[:nbytes])
+            except HeaderTooLarge:
+                self.server.stats.error('header_too_large')
+                print(f"Handshake excede {self.config.buflen} bytes: {self.addr}")
+                self.close()
+                return
+            if done:
+                self._timer.cancel()
+                self.server.stats.handshake_latency.observe(self.loop.time() - self.accepted)
+                self._authorize()
+
+    def _handshake_timeout(self):
+        self.server.stats.error('handshake_timeout')
+        print(f"Timeout: {self.addr}")
+        self.close()
+
+    def _authorize(self):
+        parser = self.parser
+        if password_ok(parser.get(b'x-pass'), self.config.password):
+            host_port = parser.get(b'x-real-host') or self.config.default_host.encode()
+            self._connect(host_port.decode())
+        else:
+            self.server.stats.error('wrong_pass')
+            self.transport.write(b'HTTP/1.1 400 WrongPass!\r\n\r\n')
+            self.close()
+
+    def _connect(self, path: str):
+        host, port = split_host_port(path, self.config.default_port)
+        self.state = CONNECTING
+        self._connect_started = self.loop.time()
+        self.transport.pause_reading()
+        self._connect_task = self.loop.create_task(self._open_target(host, port))
+
+    async def _open_target(self, host: str, port: int):
+        try:
+            await open_connection(self.server.resolver, host, port, self._dial)
+        except Exception as e:
+            self.server.stats.error('connect_failed')
+            print(f"Erro conectando {host}:{port} - {e}")
+            self.close()
+            return
+        if self.config.log_connect:
+            print(f"Conectado: {self.addr} -> {host}:{port}")
+
+    def _dial(self, ip: str, port: int):
+        pool = self.server.pool
+        sock = pool.take(ip, port) if pool is not None else None
+        if sock is None:
+            return self.loop.create_connection(lambda: TargetProtocol(self), ip, port)
+        return self.loop.create_connection(lambda: TargetProtocol(self), sock=sock)
+
+    def target_connected(self, target):
+        if self.closed:
+            target.transport.close()
+            return
+        self.connected = self.loop.time()
+        self.waiting_first = True
+        self.server.stats.connect_latency.observe(self.connected - self._connect_started)
+        self.peer = target
+        self.alloc(self.config.chunk)
+        self.set_limits(self.config)
+        target.set_limits(self.config)
+        self.transport.write(self.config.response)
+        payload = self.parser.payload
+        if payload:
+            # Bytes que chegaram junto com os headers já pertencem ao túnel
+            target.transport.write(payload)
+            self.server.stats.total_bytes_received += len(payload)
+        limits = self.server.shaper.open(self.parser.get(b'x-pass') or self.addr[0], self.connected)
+        if limits is not None:
+            self.limits = limits
+            self.take = limits.upload
+            target.take = limits.download
+        self.parser = None
+        self.state = RELAY
+        self.server.idle.add(self)
+        if self.server.heartbeat is not None:
+            self.server.heartbeat.add(self)
+        if not self.blocked:
+            self.transport.resume_reading()
+
+    def expire(self):
+        self.close()
+
+    def ping(self) -> bool:
+        if self.transport.is_closing() or self.transport.get_write_buffer_size():
+            return False
+        self.transport.write(PING)
+        return True
+
+    def eof_received(self):
+        if self.state == HEADERS:
+            self.server.stats.error('client_closed')
+        self.close()
+
+    def connection_lost(self, exc):
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.server.stats.active_connections -= 1
+        if self._timer:
+            self._timer.cancel()
+        self.server.idle.discard(self)
+        if self.server.heartbeat is not None:
+            self.server.heartbeat.discard(self)
+        if self.limits is not None:
+            self.limits.close()
+            for side in (self, self.peer):
+                if side.throttle is not None:
+                    side.throttle.cancel()
+        for side in (self, self.peer):
+            if side is not None and side.write_paused:
+                # O transporte fechado não chama resume_writing
+                side.write_paused = False
+                self.stats.paused_connections -= 1
+        self.transport.close()
+        if self.peer and self.peer.transport:
+            self.peer.transport.close()
+
+class ProtocolServer:
+    """Servidor baseado em loop.create_server com ClientProtocol"""
+    def __init__(self, config, stats=None, idle=None, resolver=None, shaper=None, heartbeat=None,
+                 pool=None):
+        self.config = config
+        self.stats = stats if stats is not None else Metrics()
+        self.idle = idle if idle is not None else IdleWheel(config.timeout)
+        self.resolver = resolver if resolver is not None else DNSCache(
+            config.dns_ttl, config.dns_negative_ttl, config.dns_cache_size)
+        self.shaper = shaper if shaper is not None else Shaper(config, config.processes)
+        self.heartbeat = heartbeat  # Heartbeat do loop quando o perfil tem KEEPALIVE
+        self.pool = pool            # ConnectionPool quando o perfil tem pool
+        self.loop = None
+        self.handshake_view = memoryview(bytearray(config.buflen))
+
+    async def start(self, sock) -> asyncio.AbstractServer:
+        """Atende no listener já aberto (handoff.listen ou herdado com -u)"""
+        self.loop = asyncio.get_running_loop()
+        return await self.loop.create_server(lambda: ClientProtocol(self), sock=sock)
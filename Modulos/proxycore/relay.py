@@ -0,0 +1,162 @@
+# encoding: utf-8
+# SSHPLUS - Relay do túnel depois do handshake
+
+import asyncio
+import socket
+
+from .buffers import AdaptiveBuffer
+from .heartbeat import PING
+
+def setup_relay(config):
+    """Valida o relay escolhido; sem suporte a splice volta ao modo stream"""
+    if config.core == 'protocol' and config.relay == 'splice':
+        print("\033[1;31mrelay splice disponível apenas no núcleo stream\033[0m")
+        config.relay = 'stream'
+    if config.websocket == 'frame' and config.core == 'protocol':
+        print("\033[1;31mwebsocket frame disponível apenas no núcleo stream\033[0m")
+        config.core = 'stream'
+    if config.websocket != 'frame':
+        config.websocket = 'raw'
+    if config.relay != 'splice':
+        config.relay = 'stream'
+        return
+    from . import splice
+    if not splice.splice_supported():
+        print("\033[1;31msplice(2) indisponível, usando relay stream\033[0m")
+        config.relay = 'stream'
+
+class _Tunnel:
+    """Entrada do túnel na IdleWheel e no Heartbeat: expirar fecha os dois lados"""
+    __slots__ = ('writers', 'last_activity', 'pinged')
+
+    def __init__(self, *writers):
+        self.writers = writers
+        self.last_activity = 0.0
+        self.pinged = 0.0
+
+    def expire(self):
+        # Os pipes acordam com EOF e encerram normalmente
+        for writer in self.writers:
+            writer.close()
+
+    def ping(self) -> bool:
+        """Ping ao cliente, se nada estiver esperando para ser enviado"""
+        transport = self.writers[0].transport
+        if transport.is_closing() or transport.get_write_buffer_size():
+            return False
+        transport.write(PING)
+        return True
+
+async def bidirectional_proxy(config, metrics, client_reader, client_writer,
+                              target_reader, target_writer, idle, connected=None,
+                              limits=None, codec=None, heartbeat=None):
+    """Proxy bidirecional com buffer adaptativo (ou splice, se habilitado)
+
+    idle é a IdleWheel do loop: fecha o túnel sem tráfego há TIMEOUT.
+    connected (loop.time() da conexão ao destino) mede o tempo até o 1º byte de volta.
+    limits (shaping.Limits) suspende a leitura de quem passar da banda.
+    codec (websocket.FrameCodec) desembrulha os frames do cliente e embrulha
+    o que volta do destino; túneis com frames não usam splice.
+    heartbeat (Heartbeat do loop) manda ping ao cliente parado há KEEPALIVE.
+    """
+    loop = asyncio.get_running_loop()
+
+    def first_byte():
+        metrics.first_byte_latency.observe(loop.time() - connected)
+
+    if config.relay == 'splice' and codec is None:
+        from . import splice
+        if splice.can_splice(client_writer, target_writer):
+            if config.keepalive:
+                # Sem acesso ao stream não há auto-ping; o keep-alive fica com o TCP
+                sock = client_writer.get_extra_info('socket')
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            received, sent = await splice.relay(client_reader, client_writer,
+                                                target_reader, target_writer, idle, metrics,
+                                                first_byte if connected is not None else None,
+                                                limits)
+            metrics.total_bytes_received += received
+            metrics.total_bytes_sent += sent
+            return
+
+    # Um buffer por sentido: upload e download crescem independentemente
+    upstream = AdaptiveBuffer.from_config(config, metrics.buffer_sizes['upstream'])
+    downstream = AdaptiveBuffer.from_config(config, metrics.buffer_sizes['downstream'])
+
+    tunnel = _Tunnel(client_writer, target_writer)
+    high = config.write_high
+    for writer in (client_writer, target_writer):
+        writer.transport.set_write_buffer_limits(high, config.write_low)
+
+    async def pipe(reader, writer, buffer, sent, source, take, decode=None, encode=None):
+        waiting_first = sent and connected is not None
+        transport = writer.transport
+        try:
+            while True:
+                data = await reader.read(buffer.size)
+                if not data or transport.is_closing():
+                    break
+                tunnel.last_activity = loop.time()
+                buffer.record(len(data))
+                if decode is not None:
+                    data = decode(data)
+                    if not data:
+                        if codec.closed:
+                            break
+                        continue    # só controle ou frame incompleto
+                if waiting_first:
+                    waiting_first = False
+                    first_byte()
+
+                size = len(data)
+                writer.write(data if encode is None else encode(data))
+                if transport.get_write_buffer_size() > high:
+                    # drain() só espera acima de WRITE_HIGH; antes disso nem é chamado
+                    metrics.paused_connections += 1
+                    metrics.backpressure_events += 1
+                    try:
+                        await writer.drain()
+                    finally:
+                        metrics.paused_connections -= 1
+                if take is not None:
+                    wait = take(size, tunnel.last_activity)
+                    if wait:
+                        # Sem ler a origem a janela TCP fecha e o remetente espera
+                        source.pause_reading()
+                        await asyncio.sleep(wait)
+                        source.resume_reading()
+
+                if sent:
+                    metrics.total_bytes_sent += size
+                else:
+                    metrics.total_bytes_received += size
+
+        except Exception:
+            pass
+        finally:
+            buffer.release()
+            if heartbeat is not None:
+                heartbeat.discard(tunnel)
+            if codec is not None and sent and not writer.is_closing():
+                codec.close()
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except:
+                pass
+
+    tasks = [
+        pipe(client_reader, target_writer, upstream, False, client_writer.transport,
+             limits.upload if limits else None, decode=codec and codec.unwrap),
+        pipe(target_reader, client_writer, downstream, True, target_writer.transport,
+             limits.download if limits else None, encode=codec and codec.wrap),
+    ]
+    idle.add(tunnel)
+    if heartbeat is not None:
+        heartbeat.add(tunnel)
+    try:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        idle.discard(tunnel)
+        if heartbeat is not None:
+            heartbeat.discard(tunnel)
@@ -0,0 +1,114 @@
+# encoding: utf-8
+# SSHPLUS - Cache de DNS dos destinos (X-Real-Host / DEFAULT_HOST)
+# Os injectors repetem os mesmos poucos hosts milhares de vezes por minuto;
+# sem cache cada túnel faz um getaddrinfo no thread pool do asyncio.
+
+import asyncio
+import socket
+from collections import OrderedDict
+
+def is_literal(host: str) -> bool:
+    """IPv4/IPv6 literal: não precisa de resolução"""
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (OSError, ValueError):
+            pass
+    return False
+
+def _retrieve(task: asyncio.Task):
+    """Marca a exceção como lida se todos os chamadores já desistiram"""
+    if not task.cancelled():
+        task.exception()
+
+class DNSCache:
+    """Resolver com TTL, limite de entradas (LRU), cache negativo e coalescência
+
+    getaddrinfo não devolve o TTL do registro: usa-se um TTL fixo. Buscas
+    simultâneas pelo mesmo host esperam a mesma resolução.
+    """
+    def __init__(self, ttl: float = 60, negative_ttl: float = 5, max_entries: int = 1024):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # host -> (expira_em, [ips] ou exceção)
+        self._pending = {}           # host -> Future da resolução em andamento
+        self.stats = {'hits': 0, 'misses': 0, 'negative_hits': 0, 'coalesced': 0, 'literal': 0}
+
+    async def resolve(self, host: str) -> list:
+        """Lista de IPs do host; levanta socket.gaierror (também do cache negativo)"""
+        stats = self.stats
+        if is_literal(host):
+            stats['literal'] += 1
+            return [host]
+
+        loop = asyncio.get_running_loop()
+        entry = self._cache.get(host)
+        if entry is not None:
+            expires, result = entry
+            if expires > loop.time():
+                self._cache.move_to_end(host)
+                if isinstance(result, Exception):
+                    stats['negative_hits'] += 1
+                    # Exceção nova a cada vez: relançar a mesma acumularia traceback
+                    raise type(result)(*result.args)
+                stats['hits'] += 1
+                return result
+            del self._cache[host]
+
+        pending = self._pending.get(host)
+        if pending is not None:
+            stats['coalesced'] += 1
+        else:
+            stats['misses'] += 1
+            pending = self._pending[host] = loop.create_task(self._lookup(host))
+            pending.add_done_callback(_retrieve)
+        try:
+            # Quem desiste (túnel fechado) não cancela a resolução dos outros
+            return await asyncio.shield(pending)
+        except (OSError, UnicodeError) as e:
+            # Cópia por chamador: relançar a mesma acumularia traceback
+            raise type(e)(*e.args) from None
+
+    async def _lookup(self, host: str) -> list:
+        """Resolução compartilhada pelos chamadores simultâneos do host"""
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError) as e:
+            self._store(host, loop.time() + self.negative_ttl, type(e)(*e.args))
+            raise
+        else:
+            # Sem duplicatas, na ordem do getaddrinfo (preferência do sistema)
+            result = list(dict.fromkeys(info[4][0] for info in infos))
+            self._store(host, loop.time() + self.ttl, result)
+            return result
+        finally:
+            del self._pending[host]
+
+    def _store(self, host: str, expires: float, result):
+        cache = self._cache
+        cache[host] = (expires, result)
+        cache.move_to_end(host)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def __len__(self):
+        return len(self._cache)
+
+async def open_connection(resolver: DNSCache, host: str, port: int, connect=None):
+    """Resolve pelo cache e tenta os IPs em ordem até um conectar
+
+    connect(ip, port) abre a conexão (padrão: asyncio.open_connection);
+    com IP literal o asyncio não chama getaddrinfo de novo.
+    """
+    if connect is None:
+        connect = asyncio.open_connection
+    error = None
+    for ip in await resolver.resolve(host):
+        try:
+            return await connect(ip, port)
+        except OSError as e:
+            error = e
+    raise error
@@ -0,0 +1,382 @@
+# encoding: utf-8
+# SSHPLUS - Servidor dos proxies e ciclo de vida (start, drenagem, workers)
+
+import asyncio
+import signal
+
+from .config import RATES
+from .handshake import HeaderParser, HeaderTooLarge, read_handshake, split_host_port, password_ok
+from .heartbeat import Heartbeat
+from .idle import IdleWheel
+from .metrics import Metrics
+from .relay import bidirectional_proxy, setup_relay
+from .resolver import DNSCache, open_connection
+from .shaping import Shaper
+from .workers import METRICS_INTERVAL, Terminal, cpu_count
+
+DRAIN_POLL = 0.2        # s entre verificações durante a drenagem
+DRAIN_REPORT = 5.0      # s entre avisos de túneis ainda abertos
+
+class ProxyServer:
+    def __init__(self, config):
+        self.config = config
+        self.host = config.host
+        self.port = config.port
+        self.server = None
+        self.metrics = Metrics()
+        self.idle = self.metrics.idle = IdleWheel(config.timeout)
+        self.resolver = self.metrics.dns = DNSCache(
+            config.dns_ttl, config.dns_negative_ttl, config.dns_cache_size)
+        self.shaper = self.metrics.shaping = Shaper(config, config.processes)
+        self.heartbeat = self.metrics.heartbeat = Heartbeat(config.keepalive) if config.keepalive else None
+        self.pool = None
+        self.protocol = None    # ProtocolServer no core 'protocol'
+        self.handoff = None     # HandoffListener (-u) do processo único
+        self.stopped = None
+        self.drain_deadline = 0.0
+        self.terminal = Terminal()
+        if config.pool:
+            from .pool import ConnectionPool
+            self.pool = self.metrics.pool = ConnectionPool(config)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handler assíncrono para cada conexão cliente"""
+        config = self.config
+        metrics = self.metrics
+        metrics.total_connections += 1
+        metrics.active_connections += 1
+        addr = writer.get_extra_info('peername')
+        loop = asyncio.get_running_loop()
+        accepted = loop.time()
+
+        try:
+            parser = HeaderParser(config.buflen)
+            if not await asyncio.wait_for(
+                read_handshake(reader, parser),
+                timeout=config.handshake_timeout
+            ):
+                metrics.error('client_closed')
+                return
+            metrics.handshake_latency.observe(loop.time() - accepted)
+
+            host_port = parser.get(b'x-real-host')
+            if not host_port:
+                host_port = config.default_host.encode()
+
+            if password_ok(parser.get(b'x-pass'), config.password):
+                ws = (parser.headers if config.websocket == 'frame'
+                      and parser.get(b'sec-websocket-key') else None)
+                await self.method_connect(reader, writer, host_port.decode(), addr, parser.payload,
+                                          parser.get(b'x-pass') or addr[0], ws)
+            else:
+                metrics.error('wrong_pass')
+                writer.write(b'HTTP/1.1 400 WrongPass!\r\n\r\n')
+                await writer.drain()
+
+        except asyncio.TimeoutError:
+            metrics.error('handshake_timeout')
+            print(f"Timeout: {addr}")
+        except HeaderTooLarge:
+            metrics.error('header_too_large')
+            print(f"Handshake excede {config.buflen} bytes: {addr}")
+        except Exception as e:
+            metrics.error('client_error')
+            print(f"Erro {addr}: {e}")
+        finally:
+            writer.close()
+            await writer.wait_closed()
+            metrics.active_connections -= 1
+
+    async def open_target(self, host: str, port: int):
+        connect = self.pool.get_connection if self.pool is not None else None
+        return await open_connection(self.resolver, host, port, connect)
+
+    async def method_connect(self, client_reader, client_writer, path: str, addr,
+                             payload: bytes = b'', key=None, ws=None):
+        """Estabelece conexão CONNECT e inicia o relay
+
+        key agrupa o limite por usuário; ws (headers com Sec-WebSocket-Key no
+        modo -s frame) troca o 101 do perfil pelo handshake RFC 6455 e o túnel
+        passa a ser de frames, com permessage-deflate se negociado.
+        """
+        host, port = split_host_port(path, self.config.default_port)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        target_writer = None
+        try:
+            target_reader, target_writer = await self.open_target(host, port)
+            connected = loop.time()
+            self.metrics.connect_latency.observe(connected - started)
+
+            if self.config.log_connect:
+                print(f"Conectado: {addr} -> {host}:{port}")
+
+            codec = None
+            if ws:
+                from .websocket import WebSocketError, accept
+                codec, response = accept(ws, client_writer, self.config, self.metrics)
+                client_writer.write(response)
+                try:
+                    payload = codec.unwrap(payload)
+                except WebSocketError as e:
+                    # Primeiro frame inválido: o destino já estava aberto
+                    self.metrics.error('ws_protocol')
+                    print(f"WebSocket inválido {addr}: {e}")
+                    target_writer.close()
+                    client_writer.close()
+                    await client_writer.wait_closed()
+                    return
+            else:
+                client_writer.write(self.config.response)
+            await client_writer.drain()
+
+            if payload:
+                # Bytes que chegaram junto com os headers já pertencem ao túnel
+                target_writer.write(payload)
+                self.metrics.total_bytes_received += len(payload)
+
+            limits = self.shaper.open(key if key is not None else addr[0], connected)
+            try:
+                await bidirectional_proxy(
+                    self.config, self.metrics,
+                    client_reader, client_writer,
+                    target_reader, target_writer,
+                    self.idle, connected, limits, codec, self.heartbeat
+                )
+            finally:
+                if limits is not None:
+                    limits.close()
+                if codec is not None and codec.deflate is not None and self.config.log_connect:
+                    print(f"Compressão {addr}: {codec.deflate.report()}")
+
+        except Exception as e:
+            self.metrics.error('connect_failed')
+            print(f"Erro conectando {host}:{port} - {e}")
+            if target_writer is not None:
+                target_writer.close()
+            client_writer.close()
+            await client_writer.wait_closed()
+
+    def reload(self, prefix: str = ''):
+        """SIGHUP: relê o .conf; listener e túneis abertos continuam
+
+        Se o SIGHUP veio da tela do screen fechada, drena e sai.
+        """
+        if self.terminal.lost():
+            asyncio.get_running_loop().create_task(self.drain(prefix))
+            return
+        try:
+            changed = self.config.load()
+        except (OSError, ValueError) as e:
+            print(f"{prefix}\033[1;31mConfiguração mantida: {e}\033[0m")
+            return
+        if 'timeout' in changed:
+            self.idle.set_timeout(self.config.timeout)
+        if changed.keys() & set(RATES):
+            self.shaper.configure(self.config, asyncio.get_running_loop().time())
+        if 'buflen' in changed and self.protocol is not None:
+            self.protocol.handshake_view = memoryview(bytearray(self.config.buflen))
+        print(f"{prefix}\033[1;32mConfiguração recarregada: {', '.join(changed) or 'sem mudanças'}\033[0m")
+
+    async def start(self, sock, banner=True):
+        """Começa a aceitar no listener; quem espera o fim é main()"""
+        config = self.config
+        self.stopped = asyncio.Event()
+        if config.core == 'protocol':
+            from .protocol import ProtocolServer
+            self.protocol = ProtocolServer(config, self.metrics, self.idle, self.resolver,
+                                           self.shaper, self.heartbeat, self.pool)
+            self.server = await self.protocol.start(sock)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, sock=sock)
+
+        if banner:
+            print("\033[0;34m━"*8, f"\033[1;32m {config.title}", "\033[0;34m━"*8, "\n")
+            print(f"\033[1;33mIP:\033[1;32m {self.host}")
+            print(f"\033[1;33mPORTA:\033[1;32m {self.port}")
+            print(f"\033[1;33mMODO:\033[1;32m {config.mode} ({config.core}/{config.relay})\n")
+            print("\033[0;34m━"*10, f"\033[1;32m {config.footer}", "\033[0;34m━\033[1;37m"*11, "\n")
+
+    def close_handoff(self):
+        if self.handoff is not None:
+            asyncio.get_running_loop().remove_reader(self.handoff.fileno())
+            self.handoff.close()
+            self.handoff = None
+
+    async def drain(self, prefix: str = '', force: bool = False):
+        """Para de aceitar e espera os túneis abertos por até DRAIN segundos
+
+        SIGTERM repetido não muda nada; um segundo SIGINT (force) encerra o
+        prazo na hora. Ao fim do prazo os túneis restantes são fechados.
+        """
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics
+        if metrics.draining:
+            if force:
+                self.drain_deadline = 0.0
+            return
+        metrics.draining = 1
+        try:
+            self.close_handoff()
+            self.server.close()
+            self.drain_deadline = loop.time() + self.config.drain_timeout
+            print(f"\n{prefix}\033[1;33mEncerrando: sem conexões novas, {metrics.active_connections} "
+                  f"túneis drenando (prazo {self.config.drain_timeout:g}s)\033[0m")
+            report = loop.time() + DRAIN_REPORT
+            while metrics.active_connections and loop.time() < self.drain_deadline:
+                if loop.time() >= report:
+                    report += DRAIN_REPORT
+                    print(f"{prefix}\033[1;33mDrenando: {metrics.active_connections} túneis abertos\033[0m")
+                await asyncio.sleep(DRAIN_POLL)
+            if metrics.active_connections:
+                closed = self.idle.close_all()
+                print(f"{prefix}\033[1;31mPrazo de drenagem esgotado: {closed} túneis fechados\033[0m")
+                # Os pipes acordam com EOF; handshakes pendentes ficam com o próprio timeout
+                end = loop.time() + 1.0
+                while metrics.active_connections and loop.time() < end:
+                    await asyncio.sleep(DRAIN_POLL / 4)
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+            self.stopped.set()
+
+    def listen_handoff(self, prefix: str = ''):
+        """Processo único: entrega o listener a quem subir com -u e drena"""
+        from .handoff import HandoffListener, handoff_path
+        loop = asyncio.get_running_loop()
+        try:
+            self.handoff = HandoffListener(handoff_path(self.config), self.server.sockets)
+        except OSError as e:
+            print(f"{prefix}\033[1;31mTroca de versão (-u) indisponível: {e}\033[0m")
+            return
+
+        async def hand_over(listener):
+            if await listener.serve_async(loop):
+                self.handoff = None
+                print(f"{prefix}\033[1;32mListener entregue à versão nova\033[0m")
+                if not self.metrics.draining:
+                    await self.drain(prefix)
+            elif self.handoff is listener:
+                loop.add_reader(listener.fileno(), on_handoff)
+
+        def on_handoff():
+            loop.remove_reader(self.handoff.fileno())
+            loop.create_task(hand_over(self.handoff))
+
+        loop.add_reader(self.handoff.fileno(), on_handoff)
+
+async def report_metrics(server, channel):
+    """Envia periodicamente as métricas deste worker ao supervisor"""
+    while True:
+        channel.send(server.metrics.log_metrics())
+        await asyncio.sleep(METRICS_INTERVAL)
+
+async def main(config, sock, channel=None, pending=None):
+    server = ProxyServer(config)
+
+    loop = asyncio.get_running_loop()
+    prefix = f"[worker {channel.index}] " if channel else ''
+    # kill -TERM <pid>: drena; Ctrl+C duas vezes fecha sem esperar o prazo
+    loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(server.drain(prefix)))
+    loop.add_signal_handler(signal.SIGINT, lambda: loop.create_task(server.drain(prefix, True)))
+    # kill -USR1 <pid>: tabela de latências (no modo -w o supervisor repassa aos workers)
+    loop.add_signal_handler(signal.SIGUSR1, server.metrics.dump_latency, prefix)
+    # kill -HUP <pid>: relê /etc/SSHPlus/<perfil>.conf sem derrubar ninguém
+    loop.add_signal_handler(signal.SIGHUP, server.reload, prefix)
+
+    if not channel and config.metrics_port:
+        from .exporter import start_metrics_server
+        await start_metrics_server(config.metrics_host, config.metrics_port,
+                                   server.metrics.log_metrics, config.label)
+    try:
+        await server.start(sock, banner=channel is None or channel.index == 0)
+        if channel:
+            # O primeiro snapshot avisa o supervisor que este worker já aceita
+            loop.create_task(report_metrics(server, channel))
+        else:
+            if pending is not None:
+                from .handoff import confirm
+                await loop.run_in_executor(None, confirm, pending)
+            server.listen_handoff()
+        await server.stopped.wait()
+    finally:
+        server.close_handoff()
+        if channel:
+            channel.send(server.metrics.log_metrics())
+        else:
+            print(f"\033[1;36mMétricas finais: {server.metrics.log_metrics()}\033[0m")
+
+def open_listeners(config, count: int):
+    """Listeners herdados do processo em execução (-u) ou novos
+
+    Devolve (sockets, conexão de handoff a confirmar). Com -u o número de
+    workers segue o de listeners herdados, se for maior.
+    """
+    from . import handoff
+    if config.upgrade:
+        inherited = handoff.takeover(handoff.handoff_path(config))
+        if inherited is not None:
+            conn, sockets = inherited
+            print(f"\033[1;33mLISTENERS HERDADOS:\033[1;32m {len(sockets)}\033[0m")
+            if len(sockets) < count:
+                sockets += handoff.listen(config, count - len(sockets))
+            return sockets, conn
+        print("\033[1;31mNenhum processo para assumir nesta porta; abrindo listener novo\033[0m")
+    return handoff.listen(config, count), None
+
+def run_supervisor(config, sockets, pending) -> dict:
+    """Modo multi-processo: um worker por listener (SO_REUSEPORT)"""
+    from . import handoff, workers
+
+    def run_worker(channel):
+        """Processo worker: event loop próprio no seu listener"""
+        for index, sock in enumerate(sockets):
+            if index != channel.index:
+                sock.close()
+        asyncio.run(main(config, sockets[channel.index], channel))
+
+    def ready():
+        """Todos os workers aceitando: libera o processo antigo e abre o handoff"""
+        if pending is not None:
+            handoff.confirm(pending)
+        try:
+            return handoff.HandoffListener(handoff.handoff_path(config), sockets)
+        except OSError as e:
+            print(f"\033[1;31mTroca de versão (-u) indisponível: {e}\033[0m")
+            return None
+
+    listener = None
+    if config.metrics_port:
+        from .exporter import MetricsListener
+        listener = MetricsListener(config.metrics_host, config.metrics_port, config.label)
+
+    print(f"\033[1;33mWORKERS:\033[1;32m {len(sockets)}\033[0m")
+    return workers.Supervisor(len(sockets), run_worker, listener=listener,
+                              sockets=sockets, on_ready=ready).run()
+
+def run(config, argv):
+    """Ponto de entrada dos perfis proxy.py, open.py e wsproxy.py"""
+    from . import handoff
+    if argv:
+        config.parse_args(argv)
+    try:
+        config.load()
+    except (OSError, ValueError) as e:
+        print(f"\033[1;31mConfiguração ignorada: {e}\033[0m")
+    setup_relay(config)
+
+    count = config.workers or cpu_count()
+    sockets, pending = open_listeners(config, count)
+    config.processes = len(sockets)
+    # Os workers saem por os._exit: só este processo escreve e apaga o pidfile
+    pidfile = handoff.write_pid(config)
+    try:
+        if len(sockets) > 1:
+            metrics = run_supervisor(config, sockets, pending)
+            print(f"\033[1;36mMétricas agregadas: {metrics}\033[0m")
+        else:
+            asyncio.run(main(config, sockets[0], pending=pending))
+    finally:
+        handoff.remove_pid(pidfile)
+    print('\033[1;32mServidor encerrado.\033[0m')
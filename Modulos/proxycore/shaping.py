@@ -0,0 +1,148 @@
+# encoding: utf-8
+# SSHPLUS - Limite de banda por túnel, por usuário e total (token bucket)
+# Os baldes são reabastecidos sob demanda (tempo decorrido x taxa) a cada
+# chunk: nenhum timer por conexão. Quem fica devendo para de ler a origem
+# pelo tempo da dívida; o TCP segura o remetente em vez de o proxy acumular.
+# Taxas em kbit/s (como no tc); 0 desliga o nível. RATE_TOTAL vale para o
+# processo: no modo -w é dividida entre os workers.
+
+BURST = 0.25        # s de taxa que o balde acumula parado
+MIN_BURST = 16384   # bytes; nunca menor que um chunk do relay
+
+def kbit(rate: float) -> float:
+    """kbit/s -> bytes/s"""
+    return rate * 125
+
+class TokenBucket:
+    """Saldo em bytes; pode ficar negativo (dívida) depois de um chunk grande"""
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate: float, now: float):
+        self.stamp = now
+        self.set_rate(rate)
+        self.tokens = self.burst
+
+    def set_rate(self, rate: float):
+        self.rate = rate
+        self.burst = max(rate * BURST, MIN_BURST)
+
+    def take(self, nbytes: int, now: float) -> float:
+        """Debita nbytes; devolve quantos segundos a origem deve ficar sem leitura"""
+        tokens = self.tokens + (now - self.stamp) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        tokens -= nbytes
+        self.tokens = tokens
+        self.stamp = now
+        return -tokens / self.rate if tokens < 0 else 0.0
+
+class Limits:
+    """Baldes de um túnel: upload e download cobram túnel, usuário e total"""
+    __slots__ = ('shaper', 'key', 'own', 'up', 'down')
+
+    def __init__(self, shaper, key, now: float):
+        self.shaper = shaper
+        self.key = key
+        self.own = None
+        self.build(now)
+
+    def build(self, now: float):
+        shaper = self.shaper
+        up, down = [], []
+        if shaper.tunnel_rate:
+            if self.own is None:
+                self.own = (TokenBucket(shaper.tunnel_rate, now), TokenBucket(shaper.tunnel_rate, now))
+            up.append(self.own[0])
+            down.append(self.own[1])
+        else:
+            self.own = None
+        if shaper.user_rate:
+            user = shaper.users[self.key]
+            up.append(user[0])
+            down.append(user[1])
+        if shaper.total is not None:
+            up.append(shaper.total[0])
+            down.append(shaper.total[1])
+        self.up = tuple(up)
+        self.down = tuple(down)
+
+    def _take(self, buckets, nbytes: int, now: float) -> float:
+        wait = 0.0
+        for bucket in buckets:
+            delay = bucket.take(nbytes, now)
+            if delay > wait:
+                wait = delay
+        if wait:
+            stats = self.shaper.stats
+            stats['pauses'] += 1
+            stats['paused_seconds'] += wait
+        return wait
+
+    def upload(self, nbytes: int, now: float) -> float:
+        return self._take(self.up, nbytes, now)
+
+    def download(self, nbytes: int, now: float) -> float:
+        return self._take(self.down, nbytes, now)
+
+    def close(self):
+        self.shaper.release(self)
+
+class Shaper:
+    """Baldes de um event loop; open() devolve None quando nada está limitado"""
+    def __init__(self, config, share: int = 1):
+        self.share = share          # workers dividindo RATE_TOTAL
+        self.tunnel_rate = self.user_rate = 0.0
+        self.total = None           # (upload, download)
+        self.users = {}             # X-Pass ou IP -> [upload, download, túneis]
+        self.tunnels = set()        # Limits abertos, para o SIGHUP mudar as taxas
+        self.stats = {'pauses': 0, 'paused_seconds': 0.0}
+        self.configure(config, 0.0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tunnel_rate or self.user_rate or self.total)
+
+    def configure(self, config, now: float):
+        """Aplica RATE_TUNNEL/RATE_USER/RATE_TOTAL (partida e SIGHUP)"""
+        self.tunnel_rate = kbit(config.rate_tunnel)
+        self.user_rate = kbit(config.rate_user)
+        total = kbit(config.rate_total) / self.share
+        if not total:
+            self.total = None
+        elif self.total is None:
+            self.total = (TokenBucket(total, now), TokenBucket(total, now))
+        else:
+            for bucket in self.total:
+                bucket.set_rate(total)
+        for user in self.users.values():
+            for bucket in user[:2]:
+                bucket.set_rate(self.user_rate)
+        for limits in self.tunnels:
+            if limits.own is not None and self.tunnel_rate:
+                for bucket in limits.own:
+                    bucket.set_rate(self.tunnel_rate)
+            limits.build(now)
+
+    def open(self, key, now: float):
+        """Limits do túnel novo (key: X-Pass ou IP do cliente)"""
+        if not self.enabled:
+            return None
+        # Contado mesmo sem RATE_USER: um SIGHUP pode ligá-lo depois
+        user = self.users.get(key)
+        if user is None:
+            user = self.users[key] = [TokenBucket(self.user_rate, now),
+                                      TokenBucket(self.user_rate, now), 0]
+        user[2] += 1
+        limits = Limits(self, key, now)
+        self.tunnels.add(limits)
+        return limits
+
+    def release(self, limits: Limits):
+        if limits not in self.tunnels:
+            return
+        self.tunnels.discard(limits)
+        user = self.users.get(limits.key)
+        if user is not None:
+            user[2] -= 1
+            if user[2] <= 0:
+                del self.users[limits.key]
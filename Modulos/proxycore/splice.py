@@ -0,0 +1,231 @@
+# encoding: utf-8
+# SSHPLUS - Relay zero-copy com splice(2)
+# Depois do handshake os bytes vão socket -> pipe -> socket dentro do kernel,
+# sem passar por objetos bytes no Python.
+
+import asyncio
+import fcntl
+import os
+import socket
+import sys
+
+PIPE_SIZE = 1 << 16
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+SPLICE_FLAGS = getattr(os, 'SPLICE_F_MOVE', 0) | getattr(os, 'SPLICE_F_NONBLOCK', 0)
+
+_supported = None
+
+def splice_supported() -> bool:
+    """Verifica uma única vez se o kernel aceita splice entre socket TCP e pipe"""
+    global _supported
+    if _supported is None:
+        _supported = _probe()
+    return _supported
+
+def _probe() -> bool:
+    if not sys.platform.startswith('linux') or not hasattr(os, 'splice'):
+        return False
+    socks = []
+    pipe_r = pipe_w = -1
+    try:
+        lsock = socket.socket()
+        socks.append(lsock)
+        lsock.bind(('127.0.0.1', 0))
+        lsock.listen(1)
+        csock = socket.create_connection(lsock.getsockname())
+        socks.append(csock)
+        ssock, _ = lsock.accept()
+        socks.append(ssock)
+        pipe_r, pipe_w = os.pipe()
+        csock.sendall(b'x')
+        return os.splice(ssock.fileno(), pipe_w, 1) == 1
+    except OSError:
+        return False
+    finally:
+        for s in socks:
+            s.close()
+        for fd in (pipe_r, pipe_w):
+            if fd >= 0:
+                os.close(fd)
+
+def can_splice(*writers) -> bool:
+    """Só sockets TCP sem TLS podem ser retirados do transporte"""
+    if not splice_supported():
+        return False
+    for writer in writers:
+        if writer.get_extra_info('sslcontext') is not None:
+            return False
+        sock = writer.get_extra_info('socket')
+        if sock is None or sock.type != socket.SOCK_STREAM:
+            return False
+    return True
+
+class _Direction:
+    """Um sentido do túnel: origem -> pipe -> destino"""
+    def __init__(self, relay, src: int, dst: int):
+        self.relay = relay
+        self.src = src
+        self.dst = dst
+        self.pipe_r, self.pipe_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        try:
+            fcntl.fcntl(self.pipe_w, F_SETPIPE_SZ, PIPE_SIZE)
+        except OSError:
+            pass
+        self.pending = 0
+        self.bytes = 0
+        self.on_first = None    # chamado no primeiro byte recebido da origem
+        self.take = None        # Limits.upload/download quando há limite de banda
+        self.waiting = False    # destino cheio: conta em metrics.paused_connections
+        self.throttle = None    # TimerHandle enquanto a leitura está suspensa
+
+    def on_readable(self):
+        try:
+            n = os.splice(self.src, self.pipe_w, PIPE_SIZE, flags=SPLICE_FLAGS)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.relay.finish()
+            return
+        if n == 0:
+            self.relay.finish()
+            return
+        if self.on_first:
+            on_first, self.on_first = self.on_first, None
+            on_first()
+        self.pending += n
+        self.relay.touch()
+        self.flush()
+        if self.take is not None:
+            wait = self.take(n, self.relay.last_activity)
+            if wait and not self.relay.closed:
+                self.relay.loop.remove_reader(self.src)
+                self.throttle = self.relay.loop.call_later(wait, self.unthrottle)
+
+    def unthrottle(self):
+        self.throttle = None
+        if not self.pending and not self.relay.closed:
+            self.relay.loop.add_reader(self.src, self.on_readable)
+
+    def on_writable(self):
+        self.relay.loop.remove_writer(self.dst)
+        self.flush()
+        if not self.pending and self.waiting:
+            self.waiting = False
+            self.relay.metrics.paused_connections -= 1
+        if not self.pending and not self.relay.closed and self.throttle is None:
+            self.relay.loop.add_reader(self.src, self.on_readable)
+
+    def flush(self):
+        while self.pending:
+            try:
+                n = os.splice(self.pipe_r, self.dst, self.pending, flags=SPLICE_FLAGS)
+            except BlockingIOError:
+                # Destino cheio: para de ler a origem até o socket aceitar escrita
+                if not self.waiting:
+                    self.waiting = True
+                    self.relay.metrics.paused_connections += 1
+                    self.relay.metrics.backpressure_events += 1
+                self.relay.loop.remove_reader(self.src)
+                self.relay.loop.add_writer(self.dst, self.on_writable)
+                return
+            except OSError:
+                self.relay.finish()
+                return
+            if n == 0:
+                self.relay.finish()
+                return
+            self.pending -= n
+            self.bytes += n
+
+    def close(self):
+        if self.throttle is not None:
+            self.throttle.cancel()
+        if self.waiting:
+            self.waiting = False
+            self.relay.metrics.paused_connections -= 1
+        os.close(self.pipe_r)
+        os.close(self.pipe_w)
+
+class SpliceRelay:
+    """Túnel bidirecional dirigido por loop.add_reader/add_writer"""
+    def __init__(self, loop, client_fd: int, target_fd: int, idle, metrics):
+        self.loop = loop
+        self.client_fd = client_fd
+        self.target_fd = target_fd
+        self.idle = idle
+        self.metrics = metrics
+        self.closed = False
+        self.done = loop.create_future()
+        self.upstream = _Direction(self, client_fd, target_fd)
+        self.downstream = _Direction(self, target_fd, client_fd)
+        self.last_activity = 0.0
+
+    def start(self):
+        self.loop.add_reader(self.client_fd, self.upstream.on_readable)
+        self.loop.add_reader(self.target_fd, self.downstream.on_readable)
+        self.idle.add(self)
+
+    def touch(self):
+        self.last_activity = self.loop.time()
+
+    def expire(self):
+        self.finish()
+
+    def finish(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.idle.discard(self)
+        for fd in (self.client_fd, self.target_fd):
+            self.loop.remove_reader(fd)
+            self.loop.remove_writer(fd)
+            os.close(fd)
+        self.upstream.close()
+        self.downstream.close()
+        if not self.done.done():
+            self.done.set_result(None)
+
+def _take_buffered(reader) -> bytes:
+    # Bytes que o StreamReader já recebeu (ex.: payload logo após os headers)
+    data = bytes(reader._buffer)
+    reader._buffer.clear()
+    return data
+
+def _detach(writer) -> int:
+    fd = os.dup(writer.get_extra_info('socket').fileno())
+    writer.transport.abort()
+    return fd
+
+async def relay(client_reader, client_writer, target_reader, target_writer, idle,
+                metrics, on_first_byte=None, limits=None):
+    """Proxy bidirecional via splice; retorna (bytes cliente->destino, bytes destino->cliente)"""
+    loop = asyncio.get_running_loop()
+    client_writer.transport.pause_reading()
+    target_writer.transport.pause_reading()
+
+    early_up = _take_buffered(client_reader)
+    early_down = _take_buffered(target_reader)
+    if early_up:
+        target_writer.write(early_up)
+    if early_down:
+        client_writer.write(early_down)
+
+    # Esvazia os buffers de escrita antes de tirar os sockets do transporte
+    for writer in (client_writer, target_writer):
+        writer.transport.set_write_buffer_limits(high=0)
+        await writer.drain()
+
+    tunnel = SpliceRelay(loop, _detach(client_writer), _detach(target_writer), idle, metrics)
+    if on_first_byte and early_down:
+        on_first_byte()
+    else:
+        tunnel.downstream.on_first = on_first_byte
+    if limits is not None:
+        tunnel.upstream.take = limits.upload
+        tunnel.downstream.take = limits.download
+    tunnel.start()
+    try:
+        await tunnel.done
+    finally:
+        tunnel.finish()
+    return tunnel.upstream.bytes + len(early_up), tunnel.downstream.bytes + len(early_down)
@@ -0,0 +1,207 @@
+# encoding: utf-8
+# SSHPLUS - Enquadramento WebSocket (RFC 6455) do wsproxy.py no modo -s frame
+#
+# No modo raw (padrão) o 101 é só a resposta do handshake e o túnel segue em
+# TCP puro, como os injectors esperam. No modo frame, clientes que mandam
+# Sec-WebSocket-Key recebem o 101 completo e o túnel passa a ser de frames:
+# o cliente manda frames mascarados que são desembrulhados para o destino e o
+# que volta do destino segue em frames binários. Ping/pong/close são frames
+# de controle próprios e nunca entram no payload do túnel. Com DEFLATE=1 as
+# mensagens podem ir comprimidas (permessage-deflate, ver deflate.py).
+
+import base64
+import hashlib
+import struct
+
+GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONT, OP_TEXT, OP_BINARY = 0x0, 0x1, 0x2
+OP_CLOSE, OP_PING, OP_PONG = 0x8, 0x9, 0xA
+CLOSE_NORMAL, CLOSE_PROTOCOL, CLOSE_TOO_BIG = 1000, 1002, 1009
+RSV1 = 0x40     # mensagem comprimida (permessage-deflate)
+MODES = ('raw', 'frame')
+
+class WebSocketError(Exception):
+    """Frame do cliente fora da RFC 6455; o túnel é fechado com 1002"""
+
+def accept_key(key: bytes) -> str:
+    """Sec-WebSocket-Accept para o Sec-WebSocket-Key do cliente"""
+    return base64.b64encode(hashlib.sha1(key.strip() + GUID).digest()).decode()
+
+def handshake_response(key: bytes, extensions: str = None) -> bytes:
+    extra = f'Sec-WebSocket-Extensions: {extensions}\r\n' if extensions else ''
+    return ('HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Accept: {accept_key(key)}\r\n{extra}\r\n').encode()
+
+def accept(headers: dict, writer, config, stats):
+    """Handshake de um cliente com Sec-WebSocket-Key -> (FrameCodec, resposta 101)"""
+    deflate = extensions = None
+    offer = headers.get(b'sec-websocket-extensions')
+    if offer and config.deflate:
+        from .deflate import negotiate
+        deflate, extensions = negotiate(offer.decode('latin-1'), config, stats.deflate)
+    codec = FrameCodec(writer, config.buffer_max, deflate)
+    return codec, handshake_response(headers[b'sec-websocket-key'], extensions)
+
+def frame(opcode: int, payload: bytes = b'', rsv: int = 0) -> bytes:
+    """Frame do servidor (FIN, sem máscara)"""
+    first = 0x80 | rsv | opcode
+    size = len(payload)
+    if size < 126:
+        header = bytes((first, size))
+    elif size < 0x10000:
+        header = struct.pack('!BBH', first, 126, size)
+    else:
+        header = struct.pack('!BBQ', first, 127, size)
+    return header + payload
+
+PING = frame(OP_PING)
+
+class FrameCodec:
+    """Frames de um túnel: unwrap (cliente -> destino) e wrap (destino -> cliente)
+
+    O parser é incremental: o payload de um frame de dados é repassado à
+    medida que chega, sem esperar o frame inteiro. O XOR da máscara é feito
+    de uma vez por leitura com int.from_bytes sobre memoryview, usando uma
+    chave repetida num buffer pré-alocado por túnel.
+    """
+    __slots__ = ('writer', 'deflate', 'closed', '_header', '_remaining', '_phase', '_opcode',
+                 '_fin', '_inflate', '_control', '_keys', '_key_len')
+
+    def __init__(self, writer, size: int, deflate=None):
+        self.writer = writer        # StreamWriter do cliente (pong e close)
+        self.deflate = deflate      # deflate.PerMessageDeflate se negociado
+        self.closed = False         # close enviado: o túnel está terminando
+        self._header = bytearray()
+        self._remaining = 0         # bytes do payload do frame atual ainda por vir
+        self._phase = 0             # posição na máscara do próximo byte do payload
+        self._opcode = None         # None = esperando cabeçalho
+        self._fin = True            # frame atual fecha a mensagem
+        self._inflate = False       # mensagem atual veio com RSV1
+        self._control = bytearray()
+        self._keys = bytearray(size + 8)
+        self._key_len = 0
+
+    def wrap(self, data: bytes) -> bytes:
+        if self.deflate is not None:
+            packed = self.deflate.compress(data)
+            if packed is not None:
+                return frame(OP_BINARY, packed, RSV1)
+        return frame(OP_BINARY, data)
+
+    def unwrap(self, data) -> bytes:
+        """Payload dos frames de dados contidos em data (pode ser b'')"""
+        out = []
+        view = memoryview(data)
+        while view and not self.closed:
+            if self._opcode is None:
+                if self._header:
+                    # Cabeçalho cortado entre duas leituras
+                    self._header += view
+                    view = memoryview(bytes(self._header))
+                    self._header.clear()
+                used = self._parse_header(view)
+                if not used:
+                    self._header += view
+                    break
+                view = view[used:]
+                if self._remaining:
+                    continue
+                if self._opcode < OP_CLOSE and self._inflate and self._fin:
+                    out.append(self._decompress(b'', True))    # frame final vazio
+            else:
+                take = min(self._remaining, len(view))
+                chunk = self._unmask(view[:take])
+                view = view[take:]
+                self._remaining -= take
+                if self._opcode >= OP_CLOSE:
+                    self._control += chunk
+                elif self._inflate:
+                    out.append(self._decompress(chunk, self._fin and not self._remaining))
+                else:
+                    out.append(chunk)
+                if self._remaining:
+                    continue
+            self._end_frame()
+        return b''.join(out)
+
+    def close(self, code: int = CLOSE_NORMAL):
+        """Envia close uma única vez"""
+        if not self.closed:
+            self.closed = True
+            self.writer.write(frame(OP_CLOSE, struct.pack('!H', code)))
+
+    def _parse_header(self, header: memoryview) -> int:
+        """Tamanho do cabeçalho consumido; 0 se ainda faltam bytes"""
+        if len(header) < 2:
+            return 0
+        first, second = header[0], header[1]
+        size = second & 0x7F
+        start = 2 + (2 if size == 126 else 8 if size == 127 else 0)
+        if len(header) < start + 4:
+            return 0
+        opcode = first & 0x0F
+        # RSV1 só no primeiro frame de uma mensagem de dados, e se houver deflate
+        allowed = RSV1 if self.deflate is not None and opcode in (OP_TEXT, OP_BINARY) else 0
+        if first & 0x70 & ~allowed or not second & 0x80:
+            self._fail('RSV sem extensão negociada ou frame sem máscara')
+        if opcode >= OP_CLOSE and (not first & 0x80 or size > 125):
+            self._fail('frame de controle fragmentado ou maior que 125 bytes')
+        if opcode not in (OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG):
+            self._fail(f'opcode {opcode:#x} desconhecido')
+        if size == 126:
+            size = struct.unpack_from('!H', header, 2)[0]
+        elif size == 127:
+            size = struct.unpack_from('!Q', header, 2)[0]
+        if opcode < OP_CLOSE:
+            if opcode != OP_CONT:
+                self._inflate = bool(first & RSV1)
+            self._fin = bool(first & 0x80)
+        self._opcode = opcode
+        self._remaining = size
+        self._phase = 0
+        self._set_mask(bytes(header[start:start + 4]), size)
+        return start + 4
+
+    def _set_mask(self, mask: bytes, size: int):
+        # Só o trecho que o frame vai usar (+4 para começar em qualquer fase);
+        # frames maiores que o buffer reaproveitam a chave em voltas
+        cover = min(size, len(self._keys) - 8)
+        words = (cover + 3) // 4 + 1
+        self._keys[:words * 4] = mask * words
+        self._key_len = cover
+
+    def _unmask(self, data: memoryview) -> bytes:
+        keys = memoryview(self._keys)
+        size = len(data)
+        step = self._key_len
+        if size <= step:
+            phase = self._phase
+            self._phase = (phase + size) & 3
+            key = int.from_bytes(keys[phase:phase + size], 'little')
+            return (int.from_bytes(data, 'little') ^ key).to_bytes(size, 'little')
+        # Leitura maior que a chave pré-montada: em pedaços de step bytes
+        return b''.join(self._unmask(data[i:i + step]) for i in range(0, size, step))
+
+    def _decompress(self, chunk, end: bool) -> bytes:
+        data = self.deflate.decompress(chunk, end)
+        if data is None:
+            self._fail('mensagem comprimida expande demais', CLOSE_TOO_BIG)
+        return data
+
+    def _end_frame(self):
+        opcode = self._opcode
+        self._opcode = None
+        if opcode < OP_CLOSE:
+            return
+        payload = bytes(self._control)
+        self._control.clear()
+        if opcode == OP_PING:
+            self.writer.write(frame(OP_PONG, payload))
+        elif opcode == OP_CLOSE:
+            self.close(struct.unpack('!H', payload[:2])[0] if len(payload) >= 2 else CLOSE_NORMAL)
+
+    def _fail(self, reason: str, code: int = CLOSE_PROTOCOL):
+        self.close(code)
+        raise WebSocketError(reason)
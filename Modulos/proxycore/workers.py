@@ -0,0 +1,269 @@
+# encoding: utf-8
+# SSHPLUS - Modo multi-processo com SO_REUSEPORT
+# O supervisor abre N listeners na mesma porta e cria um worker por listener
+# (cada um com seu event loop), reinicia os que caírem no mesmo listener e
+# soma as métricas que eles enviam por pipe.
+
+import json
+import os
+import selectors
+import signal
+import time
+
+METRICS_INTERVAL = 2.0
+RESTART_DELAY = 1.0
+# Valores instantâneos: deixam de contar quando o worker morre
+GAUGES = ('active_connections', 'draining', 'paused_connections', 'pool_ready', 'buffer_sizes',
+          'idle_buckets')
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+def merge(total: dict, snapshot: dict, skip=()):
+    """Soma recursivamente contadores numéricos (e dicts de contadores)"""
+    for key, value in snapshot.items():
+        if key in skip:
+            continue
+        if isinstance(value, dict):
+            merge(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+    return total
+
+class Terminal:
+    """Separa o kill -HUP (recarregar) do SIGHUP da tela do screen fechada
+
+    Com o terminal desligado o stdout deixa de ser tty: daí em diante a
+    saída vai para /dev/null e o processo deve drenar e sair.
+    """
+    def __init__(self):
+        self.attached = os.isatty(1)
+
+    def lost(self) -> bool:
+        if not self.attached or os.isatty(1):
+            return False
+        self.attached = False
+        null = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(null, 1)
+        os.dup2(null, 2)
+        os.close(null)
+        return True
+
+class WorkerChannel:
+    """Lado do worker: envia snapshots de métricas ao supervisor"""
+    def __init__(self, index: int, fd: int):
+        self.index = index
+        self.fd = fd
+        os.set_blocking(fd, False)
+
+    def send(self, metrics: dict):
+        try:
+            os.write(self.fd, (json.dumps(metrics) + '\n').encode())
+        except (BlockingIOError, BrokenPipeError):
+            pass
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.pid = 0
+        self.fd = -1
+        self.pending = b''
+        self.snapshot = {}
+        self.started = 0.0
+
+class Supervisor:
+    """Cria e vigia os workers; SIGTERM/SIGINT é repassado a todos
+
+    on_ready() roda uma vez, quando todos os workers já mandaram métricas
+    (estão aceitando), e pode devolver um HandoffListener para a troca de
+    versão; entregar os listeners encerra este supervisor com drenagem.
+    """
+    def __init__(self, count: int, worker_main, interval: float = METRICS_INTERVAL,
+                 listener=None, sockets=(), on_ready=None):
+        self.count = count
+        self.worker_main = worker_main
+        self.interval = interval
+        self.workers = [_Worker(i) for i in range(count)]
+        self.retired = {}
+        self.stopping = False
+        self.selector = selectors.DefaultSelector()
+        self.listener = listener  # MetricsListener opcional (exporter)
+        self.sockets = sockets    # listeners dos workers; fechados ao encerrar
+        self.on_ready = on_ready
+        self.handoff = None
+        self.terminal = Terminal()
+        self._wake = ()
+
+    def spawn(self, worker: _Worker):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self.selector.close()
+            if self.listener:
+                self.listener.close()
+            if self.handoff:
+                self.handoff.close(unlink=False)
+            for fd in self._wake + tuple(w.fd for w in self.workers if w.fd >= 0):
+                os.close(fd)
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD, signal.SIGUSR1, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+            signal.set_wakeup_fd(-1)
+            code = 0
+            try:
+                self.worker_main(WorkerChannel(worker.index, write_fd))
+            except KeyboardInterrupt:
+                pass
+            except BaseException as e:
+                print(f"Worker {worker.index} falhou: {e}")
+                code = 1
+            os._exit(code)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        worker.pid = pid
+        worker.fd = read_fd
+        worker.pending = b''
+        worker.snapshot = {}
+        worker.started = time.monotonic()
+        self.selector.register(read_fd, selectors.EVENT_READ, worker)
+
+    def metrics(self) -> dict:
+        """Métricas somadas dos workers vivos e dos que já saíram"""
+        total = merge({}, self.retired)
+        for worker in self.workers:
+            merge(total, worker.snapshot)
+        total['workers'] = sum(1 for w in self.workers if w.pid)
+        return total
+
+    def _read(self, worker: _Worker):
+        try:
+            data = os.read(worker.fd, 65536)
+        except BlockingIOError:
+            return
+        if not data:
+            self._close(worker)
+            return
+        *lines, worker.pending = (worker.pending + data).split(b'\n')
+        if lines:
+            try:
+                worker.snapshot = json.loads(lines[-1])
+            except ValueError:
+                pass
+
+    def _close(self, worker: _Worker):
+        self.selector.unregister(worker.fd)
+        os.close(worker.fd)
+        worker.fd = -1
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            for worker in self.workers:
+                if worker.pid == pid:
+                    if worker.fd >= 0:
+                        self._read(worker)
+                    if worker.fd >= 0:
+                        self._close(worker)
+                    merge(self.retired, worker.snapshot, skip=GAUGES)
+                    worker.pid = 0
+                    worker.snapshot = {}
+                    if not self.stopping:
+                        print(f"\033[1;31mWorker {worker.index} (PID {pid}) saiu "
+                              f"com status {os.waitstatus_to_exitcode(status)}\033[0m")
+
+    def _ready(self):
+        if self.on_ready is None or not all(w.snapshot for w in self.workers):
+            return
+        on_ready, self.on_ready = self.on_ready, None
+        self.handoff = on_ready()
+        if self.handoff:
+            self.selector.register(self.handoff, selectors.EVENT_READ, self.handoff)
+
+    def _hand_over(self):
+        self.selector.unregister(self.handoff)
+        if self.handoff.serve():
+            print("\033[1;32mListeners entregues à versão nova\033[0m")
+            self.handoff = None
+            self.stopping = True
+        else:
+            self.selector.register(self.handoff, selectors.EVENT_READ, self.handoff)
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _forward(self, signum, frame):
+        if signum == signal.SIGHUP and self.terminal.lost():
+            # Só o líder da sessão recebe o SIGHUP do kernel; repassado, cada
+            # worker também percebe o terminal perdido e drena
+            self.stopping = True
+        for worker in self.workers:
+            if worker.pid:
+                os.kill(worker.pid, signum)
+
+    def run(self) -> dict:
+        wake_r, wake_w = self._wake = os.pipe()
+        os.set_blocking(wake_r, False)
+        os.set_blocking(wake_w, False)
+        signal.set_wakeup_fd(wake_w)
+        self.selector.register(wake_r, selectors.EVENT_READ, None)
+        if self.listener:
+            self.selector.register(self.listener, selectors.EVENT_READ, self.listener)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.signal(signal.SIGUSR1, self._forward)
+        signal.signal(signal.SIGHUP, self._forward)     # cada worker relê o .conf
+
+        for worker in self.workers:
+            self.spawn(worker)
+
+        signalled = False
+        while any(w.pid for w in self.workers):
+            for key, _ in self.selector.select(timeout=self.interval):
+                if key.data is None:
+                    try:
+                        os.read(wake_r, 512)
+                    except BlockingIOError:
+                        pass
+                elif key.data is self.listener:
+                    self.listener.serve(self.metrics)
+                elif key.data is self.handoff:
+                    self._hand_over()
+                else:
+                    self._read(key.data)
+            self._reap()
+            if not self.stopping:
+                self._ready()
+
+            if self.stopping and not signalled:
+                # Cada worker drena os próprios túneis ao receber SIGTERM;
+                # sem a cópia do supervisor o listener some (ou fica com o novo)
+                signalled = True
+                if self.handoff:
+                    self.selector.unregister(self.handoff)
+                    self.handoff.close()
+                    self.handoff = None
+                for sock in self.sockets:
+                    sock.close()
+                for worker in self.workers:
+                    if worker.pid:
+                        os.kill(worker.pid, signal.SIGTERM)
+            elif not self.stopping:
+                now = time.monotonic()
+                for worker in self.workers:
+                    if not worker.pid and now - worker.started >= RESTART_DELAY:
+                        self.spawn(worker)
+
+        signal.set_wakeup_fd(-1)
+        if self.listener:
+            self.selector.unregister(self.listener)
+            self.listener.close()
+        return self.metrics()
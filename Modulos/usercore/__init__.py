@@ -0,0 +1,10 @@
+# encoding: utf-8
+# SSHPLUS - Núcleo compartilhado dos daemons de usuários (limiter, online, expiração)
+#
+#   accounts  - /etc/passwd e /root/usuarios.db em memória (recarga por mtime)
+#   sessions  - sessões sshd/dropbear por UID numa passada só pelo /proc
+#   openvpn   - openvpn-status.log e kills em lote pela interface de gerência
+#   authlog   - auth.log seguido de forma incremental: PID -> usuário -> login
+#   userdb    - base de usuários indexada (SQLite WAL) com export do usuarios.db
+#   expiry    - contas vencidas: heap de expirações e remoção em lote
+#   ovpnmgmt  - cliente asyncio persistente da gerência do OpenVPN (sessões e kills)
@@ -0,0 +1,72 @@
+# encoding: utf-8
+# SSHPLUS - Contas e limites em memória
+# Os scripts antigos faziam um grep no usuarios.db e no /etc/passwd por
+# usuário a cada ciclo; aqui os arquivos são lidos uma vez e só relidos
+# quando o mtime muda.
+
+import os
+
+DATABASE = '/root/usuarios.db'
+PASSWD = '/etc/passwd'
+MIN_UID = 1000
+NOBODY = 65534
+
+class WatchedFile:
+    """Conteúdo parseado de um arquivo, relido só quando mtime/tamanho mudam"""
+    def __init__(self, path: str, parse, default=None):
+        self.path = path
+        self.parse = parse
+        self.default = default
+        self._key = None
+        self.value = default
+
+    def get(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._key = None
+            self.value = self.default
+            return self.value
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if key != self._key:
+            with open(self.path, encoding='utf-8', errors='replace') as f:
+                self.value = self.parse(f)
+            self._key = key
+        return self.value
+
+def parse_limits(lines) -> dict:
+    """usuarios.db: 'usuario limite' por linha"""
+    limits = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 2 and fields[1].isdigit():
+            limits[fields[0]] = int(fields[1])
+    return limits
+
+def parse_users(lines) -> dict:
+    """UID -> nome dos usuários comuns (UID >= 1000, sem o nobody)"""
+    users = {}
+    for line in lines:
+        fields = line.split(':')
+        if len(fields) < 3 or not fields[2].isdigit():
+            continue
+        uid = int(fields[2])
+        if MIN_UID <= uid != NOBODY:
+            users[uid] = fields[0]
+    return users
+
+class Accounts:
+    """Usuários do sistema e limites de conexão simultânea"""
+    def __init__(self, database: str = DATABASE, passwd: str = PASSWD, default_limit: int = 1):
+        self.default_limit = default_limit
+        self._limits = WatchedFile(database, parse_limits, {})
+        self._users = WatchedFile(passwd, parse_users, {})
+
+    def users(self) -> dict:
+        return self._users.get()
+
+    def limits(self) -> dict:
+        return self._limits.get()
+
+    def limit(self, user: str) -> int:
+        return self._limits.get().get(user, self.default_limit)
@@ -0,0 +1,225 @@
+# encoding: utf-8
+# SSHPLUS - Sessões sshd/dropbear a partir do auth.log
+# O fun_drop antigo fazia um grep no auth.log inteiro por PID do dropbear a
+# cada execução (PIDs x tamanho do log). Aqui o log é seguido de forma
+# incremental (offset guardado, rotação detectada pelo inode) e um mapa
+# PID -> sessão é atualizado a cada linha. O authmonitor serve esse mapa num
+# socket Unix; query() é o cliente.
+
+import os
+import re
+import socket
+import time
+from collections import namedtuple
+from datetime import datetime
+
+AUTH_LOG = '/var/log/auth.log'
+SOCKET = '/run/sshplus/authmonitor.sock'
+MARK_WINDOW = 65536    # bytes do fim do log onde mark() procura a última quebra de linha
+
+Session = namedtuple('Session', 'pid user service since')
+
+# OpenSSH >= 9.8 registra as sessões como sshd-session (ver sessions.SSHD_NAMES)
+_LINE = re.compile(r' (sshd(?:-session)?|dropbear)\[(\d+)\]: (.*)$')
+_DROPBEAR_AUTH = re.compile(r"(?:Password|Pubkey) auth succeeded for '([^']*)'")
+_SSHD_AUTH = re.compile(r'Accepted \S+ for (\S+) from')
+_SSHD_CLOSE = ('Disconnected from user ', 'pam_unix(sshd:session): session closed')
+
+def parse_time(line: str, now: float = None) -> float:
+    """Horário da linha: syslog clássico ('Oct  6 10:00:00') ou RFC 3339"""
+    if now is None:
+        now = time.time()
+    try:
+        if line[:4].isdigit():
+            return datetime.fromisoformat(line.split(' ', 1)[0]).timestamp()
+        # Sem ano no formato clássico: o atual, ou o anterior se cair no futuro
+        year = time.localtime(now).tm_year
+        stamp = time.mktime(time.strptime(f'{year} {line[:15]}', '%Y %b %d %H:%M:%S'))
+        return stamp if stamp <= now + 86400 else time.mktime(
+            time.strptime(f'{year - 1} {line[:15]}', '%Y %b %d %H:%M:%S'))
+    except ValueError:
+        return now
+
+class SessionTracker:
+    """PID -> Session, com índice por usuário para consultas O(1)"""
+    def __init__(self):
+        self.sessions = {}
+        self.by_user = {}
+
+    def feed(self, line: str):
+        if 'sshd[' not in line and 'sshd-session[' not in line and 'dropbear[' not in line:
+            return
+        match = _LINE.search(line)
+        if match is None:
+            return
+        service, pid, message = match.group(1), int(match.group(2)), match.group(3)
+        if service == 'dropbear':
+            auth = _DROPBEAR_AUTH.match(message)
+            if auth is not None:
+                self.add(Session(pid, auth.group(1), service, parse_time(line)))
+            elif message.startswith('Exit'):
+                self.remove(pid)
+        else:
+            auth = _SSHD_AUTH.match(message)
+            if auth is not None:
+                # sshd-session conta como sshd para quem consulta por serviço
+                self.add(Session(pid, auth.group(1), 'sshd', parse_time(line)))
+            elif message.startswith(_SSHD_CLOSE):
+                self.remove(pid)
+
+    def add(self, session: Session):
+        self.remove(session.pid)    # PID reaproveitado
+        self.sessions[session.pid] = session
+        self.by_user.setdefault(session.user, set()).add(session.pid)
+
+    def remove(self, pid: int):
+        session = self.sessions.pop(pid, None)
+        if session is not None:
+            pids = self.by_user[session.user]
+            pids.discard(pid)
+            if not pids:
+                del self.by_user[session.user]
+
+    def prune(self, proc: str = '/proc') -> int:
+        """Remove sessões cujo processo não existe mais (linha de saída perdida)"""
+        dead = [pid for pid in self.sessions if not os.path.exists(f'{proc}/{pid}')]
+        for pid in dead:
+            self.remove(pid)
+        return len(dead)
+
+    def user_sessions(self, user: str, service: str = None) -> list:
+        sessions = [self.sessions[pid] for pid in self.by_user.get(user, ())]
+        if service is not None:
+            sessions = [s for s in sessions if s.service == service]
+        return sorted(sessions, key=lambda s: s.since)
+
+    def all_sessions(self, service: str = None) -> list:
+        return sorted((s for s in self.sessions.values() if service in (None, s.service)),
+                      key=lambda s: (s.user, s.since))
+
+class LogFollower:
+    """tail -F em Python: só lê o que foi acrescentado desde a última vez
+
+    Rotação (inode novo) termina de ler o arquivo antigo e reabre do início;
+    truncamento (copytruncate) volta ao início.
+    """
+    def __init__(self, path: str, on_line):
+        self.path = path
+        self.on_line = on_line
+        self._file = None
+        self._inode = None
+        self._partial = b''
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'rb')
+        except OSError:
+            self._file = self._inode = None
+            return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._partial = b''
+
+    def _drain(self) -> int:
+        data = self._file.read()
+        if not data:
+            return 0
+        data = self._partial + data
+        lines = data.split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self.on_line(line.decode('utf-8', 'replace'))
+        return len(lines)
+
+    def mark(self) -> int:
+        """Fim da última linha completa do log agora; poll() segue desse ponto
+
+        Chamado antes de load(path, mark): o load lê até aqui e nada escrito
+        entre os dois se perde nem é lido duas vezes.
+        """
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                return 0
+        end = self._file.seek(0, os.SEEK_END)
+        start = max(end - MARK_WINDOW, 0)
+        self._file.seek(start)
+        cut = self._file.read(end - start).rfind(b'\n')
+        offset = start + cut + 1 if cut >= 0 else start
+        self._file.seek(offset)
+        return offset
+
+    def poll(self) -> int:
+        """Linhas novas processadas"""
+        if self._file is None:
+            self._open()
+            if self._file is None:
+                return 0
+        count = self._drain()
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return count    # rotacionado e ainda não recriado
+        if st.st_ino != self._inode:
+            self._file.close()
+            self._open()
+            if self._file is not None:
+                count += self._drain()
+        elif st.st_size < self._file.tell():
+            self._file.seek(0)
+            self._partial = b''
+            count += self._drain()
+        return count
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def load(path: str = AUTH_LOG, end: int = None) -> SessionTracker:
+    """Mapa montado lendo o log rotacionado (.1) e o atual de uma vez
+
+    end (LogFollower.mark()) limita a leitura do log atual a esse offset.
+    """
+    tracker = SessionTracker()
+    for name, limit in ((path + '.1', None), (path, end)):
+        try:
+            with open(name, 'rb') as f:
+                for raw in f:
+                    if limit is not None:
+                        if limit <= 0:
+                            break
+                        limit -= len(raw)
+                    tracker.feed(raw.decode('utf-8', 'replace'))
+        except OSError:
+            pass
+    tracker.prune()
+    return tracker
+
+def format_sessions(sessions) -> str:
+    """Linhas 'pid usuario servico inicio' do protocolo do socket"""
+    return ''.join(f'{s.pid} {s.user} {s.service} {s.since:.0f}\n' for s in sessions)
+
+def parse_sessions(text: str) -> list:
+    sessions = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 4:
+            sessions.append(Session(int(fields[0]), fields[1], fields[2], float(fields[3])))
+    return sessions
+
+def query(command: str, path: str = SOCKET, timeout: float = 2) -> list:
+    """Consulta o authmonitor ('LIST [servico]' ou 'USER nome [servico]')
+
+    Levanta OSError se o daemon não estiver rodando.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(command.encode() + b'\n')
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return parse_sessions(b''.join(chunks).decode('utf-8', 'replace'))
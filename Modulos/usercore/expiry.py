@@ -0,0 +1,147 @@
+# encoding: utf-8
+# SSHPLUS - Expiração de contas em lote
+# O expcleaner antigo rodava chage, date (2x) e bc por conta e, para cada
+# vencida, pkill + userdel + reescrita do usuarios.db + revoke e gen-crl.
+# Aqui o /etc/shadow é lido uma vez, as datas vão para um min-heap e as
+# contas que vencem juntas são removidas num lote: uma varredura de
+# processos, uma transação na base e um único gen-crl.
+
+import heapq
+import os
+import shutil
+import signal
+import subprocess
+import time
+
+from usercore import authlog, sessions
+from usercore.accounts import parse_users, PASSWD
+from usercore.userdb import SHADOW, read_shadow
+
+EASYRSA_DIR = '/etc/openvpn/easy-rsa'
+OPENVPN_CONF = '/etc/openvpn/server.conf'
+CRL = '/etc/openvpn/crl.pem'
+EXP_FILE = '/etc/SSHPlus/Exp'
+
+def day_start(day: int) -> float:
+    """Meia-noite local do dia (como o 'date -d' sobre a saída do chage)"""
+    date = time.gmtime(day * 86400)
+    return time.mktime((date.tm_year, date.tm_mon, date.tm_mday, 0, 0, 0, 0, 0, -1))
+
+def read_users(passwd: str = PASSWD) -> dict:
+    """nome -> UID dos usuários comuns"""
+    try:
+        with open(passwd, encoding='utf-8', errors='replace') as f:
+            return {name: uid for uid, name in parse_users(f).items()}
+    except OSError:
+        return {}
+
+class ExpiryQueue:
+    """Min-heap (vence_em, usuario) montado a partir do /etc/shadow"""
+    def __init__(self, shadow: str = SHADOW, passwd: str = PASSWD):
+        self.shadow = shadow
+        self.passwd = passwd
+        self.expiry = {}    # usuario -> vence_em (epoch)
+        self._heap = []
+        self._key = None
+
+    def refresh(self) -> bool:
+        """Relê o shadow se mudou (mudardata, criarusuario...)"""
+        try:
+            st = os.stat(self.shadow)
+        except OSError:
+            return False
+        key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if key == self._key:
+            return False
+        self._key = key
+        users = read_users(self.passwd)
+        self.expiry = {name: day_start(day) for name, day in read_shadow(self.shadow).items()
+                       if name in users}
+        self._heap = [(when, name) for name, when in self.expiry.items()]
+        heapq.heapify(self._heap)
+        return True
+
+    def next_time(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list:
+        """Usuários vencidos até `now`, tirados do heap"""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, name = heapq.heappop(heap)
+            if self.expiry.get(name) == when:
+                due.append(name)
+        return due
+
+    def forget(self, names):
+        for name in names:
+            self.expiry.pop(name, None)
+
+def kill_sessions(users: dict) -> int:
+    """Uma varredura do /proc (e do mapa do authmonitor) para todos os vencidos"""
+    pids = sessions.user_processes(set(users.values()), set(users))
+    try:
+        pids += [s.pid for s in authlog.query('LIST dropbear') if s.user in users]
+    except OSError:
+        pass
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+    return len(pids)
+
+def revoke_openvpn(names, easyrsa_dir: str = EASYRSA_DIR):
+    """revoke por certificado e um gen-crl só para o lote"""
+    run = dict(cwd=easyrsa_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    revoked = [name for name in names
+               if subprocess.run(['./easyrsa', '--batch', 'revoke', name], **run).returncode == 0]
+    if not revoked:
+        return revoked
+    subprocess.run(['./easyrsa', 'gen-crl'], **run)
+    for name in revoked:
+        for path in (f'pki/reqs/{name}.req', f'pki/private/{name}.key', f'pki/issued/{name}.crt'):
+            try:
+                os.unlink(os.path.join(easyrsa_dir, path))
+            except OSError:
+                pass
+        for path in (os.path.expanduser(f'~/{name}.ovpn'), f'/var/www/html/openvpn/{name}.zip'):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    # Falha aqui não pode derrubar o expcleaner -d no meio do lote
+    tmp = CRL + '.tmp'
+    try:
+        shutil.copyfile(os.path.join(easyrsa_dir, 'pki/crl.pem'), tmp)
+    except OSError:
+        return revoked      # gen-crl falhou: o CRL em uso continua
+    try:
+        shutil.chown(tmp, 'nobody', 'nogroup')
+    except (OSError, LookupError):
+        pass                # sem o grupo nogroup: a cópia 0644 já é legível
+    try:
+        os.replace(tmp, CRL)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    return revoked
+
+def expire_batch(names, store=None) -> list:
+    """Remove as contas do lote; devolve as que saíram do sistema"""
+    users = read_users()
+    names = [name for name in names if name in users]
+    if not names:
+        return []
+    kill_sessions({name: users[name] for name in names})
+    removed = [name for name in names
+               if subprocess.run(['userdel', '--force', name], stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL).returncode == 0]
+    if store is not None:
+        store.remove_many(removed)
+    if os.path.exists(OPENVPN_CONF):
+        revoke_openvpn(names)
+    return removed
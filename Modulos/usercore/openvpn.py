@@ -0,0 +1,59 @@
+# encoding: utf-8
+# SSHPLUS - OpenVPN: status por usuário e kills pela interface de gerência
+# O status é lido uma vez por ciclo (não um grep por usuário) e os kills de
+# um ciclo vão todos na mesma conexão TCP, em vez de um telnet por cliente.
+# Para daemons com event loop, ovpnmgmt mantém a conexão aberta.
+
+import socket
+
+STATUS = '/etc/openvpn/openvpn-status.log'
+MANAGEMENT = ('127.0.0.1', 7505)
+
+def parse_status(lines) -> dict:
+    """usuario -> [endereço real, ...] na ordem do arquivo
+
+    Aceita status-version 1 (seção 'OpenVPN CLIENT LIST') e 2/3
+    (linhas CLIENT_LIST, separadas por vírgula ou tab).
+    """
+    clients = {}
+    in_list = False
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.startswith('CLIENT_LIST'):
+            fields = line.split('\t' if '\t' in line else ',')
+            if len(fields) > 2:
+                clients.setdefault(fields[1], []).append(fields[2])
+        elif line.startswith('Common Name,'):
+            in_list = True
+        elif line.startswith('ROUTING TABLE') or line.startswith('GLOBAL STATS'):
+            in_list = False
+        elif in_list:
+            fields = line.split(',')
+            if len(fields) > 1:
+                clients.setdefault(fields[0], []).append(fields[1])
+    return clients
+
+def read_status(path: str = STATUS) -> dict:
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return parse_status(f)
+    except OSError:
+        return {}
+
+def kill_clients(addresses, address=MANAGEMENT, timeout: float = 3) -> int:
+    """Manda 'kill <ip:porta>' para todos numa conexão só; devolve os SUCCESS"""
+    if not addresses:
+        return 0
+    commands = ''.join(f'kill {addr}\n' for addr in addresses) + 'quit\n'
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(commands.encode())
+        data = b''
+        try:
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        except socket.timeout:
+            pass
+    return data.count(b'SUCCESS:')
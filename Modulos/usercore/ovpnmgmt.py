@@ -0,0 +1,188 @@
+# encoding: utf-8
+# SSHPLUS - Cliente asyncio da interface de gerência do OpenVPN
+# Uma conexão persistente com a porta de gerência (7505) no lugar de um
+# 'telnet localhost 7505' por cliente derrubado. A tabela de sessões por
+# usuário vem dos eventos >CLIENT: em tempo real (servidor com
+# management-client-auth) e de um 'status 3' periódico na mesma conexão,
+# que também cobre servidores sem esses eventos. Kills vão em lote: todos
+# os comandos escritos de uma vez, respostas casadas em ordem (FIFO).
+
+import asyncio
+from collections import deque
+
+from usercore.openvpn import MANAGEMENT, parse_status
+
+class ManagementError(Exception):
+    """Conexão com a gerência indisponível ou perdida"""
+
+class ManagementClient:
+    """Sessões OpenVPN por usuário e kills em lote numa conexão só
+
+    approve: responde client-auth-nt aos >CLIENT:CONNECT/REAUTH. Com
+    management-client-auth no servidor ninguém conecta sem essa resposta
+    (a senha continua validada pelo plugin antes).
+    """
+    def __init__(self, address=MANAGEMENT, poll: float = 5, approve: bool = True):
+        self.address = address
+        self.poll = poll
+        self.approve = approve
+        self.clients = {}       # endereço real -> usuario
+        self.events = 0         # notificações >CLIENT: recebidas
+        self.connected = asyncio.Event()
+        self._writer = None
+        self._pending = deque() # (future, multilinha, linhas) na ordem dos comandos
+        self._env = None        # (evento, cid, kid, {ENV}) em montagem
+        self._task = None
+
+    def sessions(self) -> dict:
+        """usuario -> [endereço, ...] na ordem em que conectaram"""
+        table = {}
+        for addr, user in self.clients.items():
+            table.setdefault(user, []).append(addr)
+        return table
+
+    def start(self):
+        self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._drop()
+
+    async def run(self, retry: float = 3):
+        """Conecta, lê e reconecta para sempre"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(*self.address)
+            except OSError:
+                await asyncio.sleep(retry)
+                continue
+            self._writer = writer
+            self.connected.set()
+            poller = asyncio.ensure_future(self._poll())
+            try:
+                await self._read(reader)
+            finally:
+                poller.cancel()
+                self._drop()
+            await asyncio.sleep(retry)
+
+    def _drop(self):
+        self.connected.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        while self._pending:
+            future = self._pending.popleft()[0]
+            if not future.done():
+                future.set_exception(ManagementError('conexão com a gerência perdida'))
+                future.exception()
+
+    async def _poll(self):
+        while True:
+            try:
+                await self.refresh()
+            except ManagementError:
+                return
+            await asyncio.sleep(self.poll)
+
+    async def _read(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            if line.startswith('>'):
+                self._notification(line)
+            elif self._pending:
+                future, multiline, lines = self._pending[0]
+                if not multiline:
+                    self._pending.popleft()
+                    if not future.done():
+                        future.set_result(line)
+                elif line == 'END' or (not lines and line.startswith('ERROR:')):
+                    self._pending.popleft()
+                    if not future.done():
+                        future.set_result(lines)
+                else:
+                    lines.append(line)
+
+    def _notification(self, line: str):
+        kind, _, body = line[1:].partition(':')
+        if kind != 'CLIENT':
+            return      # >INFO, >LOG, >STATE...
+        self.events += 1
+        event, _, args = body.partition(',')
+        if event == 'ENV':
+            if self._env is None:
+                return
+            if args == 'END':
+                self._client_event(*self._env)
+                self._env = None
+            else:
+                key, _, value = args.partition('=')
+                self._env[3][key] = value
+        elif event == 'ADDRESS':
+            return      # sem bloco ENV
+        else:
+            ids = args.split(',')
+            self._env = (event, ids[0], ids[1] if len(ids) > 1 else '', {})
+
+    def _client_event(self, event: str, cid: str, kid: str, env: dict):
+        user = env.get('common_name') or env.get('username')
+        ip = env.get('trusted_ip') or env.get('untrusted_ip')
+        port = env.get('trusted_port') or env.get('untrusted_port')
+        addr = f'{ip}:{port}' if ip and port else None
+        if event in ('CONNECT', 'REAUTH'):
+            if self.approve and self._writer is not None:
+                # Resposta sem fila: a gerência responde SUCCESS/ERROR mesmo assim
+                self._send(f'client-auth-nt {cid} {kid}', multiline=False)
+        elif event == 'ESTABLISHED':
+            if user and addr:
+                self.clients[addr] = user
+        elif event == 'DISCONNECT':
+            if addr:
+                self.clients.pop(addr, None)
+
+    def _send(self, command: str, multiline: bool):
+        if self._writer is None:
+            raise ManagementError('gerência do OpenVPN desconectada')
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((future, multiline, []))
+        self._writer.write(command.encode() + b'\n')
+        return future
+
+    async def refresh(self) -> dict:
+        """'status 3' e reconstrói a tabela; devolve sessions()"""
+        lines = await self._send('status 3', multiline=True)
+        clients = {}
+        for user, addresses in parse_status(lines).items():
+            for addr in addresses:
+                clients[addr] = user
+        self.clients = clients
+        return self.sessions()
+
+    async def kill(self, addresses) -> int:
+        """'kill <ip:porta>' de todos de uma vez; devolve quantos deram SUCCESS"""
+        futures = [self._send(f'kill {addr}', multiline=False) for addr in addresses]
+        if not futures:
+            return 0
+        # Referência local: se a conexão cair durante o drain, _drop() zera
+        # self._writer (as futures pendentes recebem ManagementError lá)
+        writer = self._writer
+        try:
+            await writer.drain()
+        except ConnectionError as e:
+            raise ManagementError('conexão com a gerência perdida') from e
+        results = await asyncio.gather(*futures)
+        killed = 0
+        for addr, result in zip(addresses, results):
+            if result.startswith('SUCCESS'):
+                killed += 1
+                self.clients.pop(addr, None)
+        return killed
@@ -0,0 +1,121 @@
+# encoding: utf-8
+# SSHPLUS - Processos por usuário numa passada só pelo /proc
+# Substitui o 'ps -u $user | grep sshd | wc -l' por usuário: cada processo
+# tem o /proc/PID/status lido uma vez (Name e Uid estão no mesmo arquivo).
+# O dono do diretório /proc/PID não serve: processos que trocaram de UID
+# (o filho do sshd) ficam não-dumpable e aparecem como root.
+
+import os
+
+PROC = '/proc'
+
+def _status(pid: str, proc: str):
+    """(nome, UID efetivo) do processo ou None se ele já saiu"""
+    try:
+        with open(f'{proc}/{pid}/status', 'rb') as f:
+            data = f.read(2048)
+    except OSError:
+        return None
+    name_end = data.find(b'\n')
+    start = data.find(b'\nUid:')
+    if not data.startswith(b'Name:') or start < 0:
+        return None
+    uid = data[start + 5:data.find(b'\n', start + 5)].split()
+    return data[5:name_end].strip().decode('utf-8', 'replace'), int(uid[1])
+
+class ProcessTable:
+    """Foto do /proc: PIDs por UID e contagem por (UID, nome)"""
+    def __init__(self):
+        self.pids = {}     # uid -> [pid, ...]
+        self.counts = {}   # (uid, nome) -> processos
+
+    def count(self, uid: int, name: str) -> int:
+        return self.counts.get((uid, name), 0)
+
+def scan(uids=None, proc: str = PROC) -> ProcessTable:
+    """Lê todos os processos; com `uids` guarda só os desses usuários"""
+    table = ProcessTable()
+    pids, counts = table.pids, table.counts
+    for entry in os.scandir(proc):
+        pid = entry.name
+        if not pid.isdigit():
+            continue
+        info = _status(pid, proc)
+        if info is None:
+            continue
+        name, uid = info
+        if uids is not None and uid not in uids:
+            continue
+        pids.setdefault(uid, []).append(int(pid))
+        key = (uid, name)
+        counts[key] = counts.get(key, 0) + 1
+    return table
+
+SSHD_NAMES = ('sshd', 'sshd-session')   # OpenSSH >= 9.8 separa o sshd-session
+
+def _field(data: bytes, key: bytes) -> bytes:
+    start = data.find(b'\n' + key)
+    if start < 0:
+        return b''
+    start += len(key) + 1
+    return data[start:data.find(b'\n', start)].strip()
+
+def online_counts(proc: str = PROC) -> dict:
+    """Sessões SSH e dropbear numa passada pelo /proc
+
+    ssh: processos 'sshd: usuario [priv]' (um por login, root fora), o mesmo
+    que 'ps x | grep sshd | grep -v root | grep priv'. dropbear: filhos de
+    outro dropbear (o listener não conta), no lugar do 'wc -l' menos 1.
+    """
+    ssh = 0
+    dropbear = {}   # pid -> ppid
+    for entry in os.scandir(proc):
+        pid = entry.name
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'{proc}/{pid}/status', 'rb') as f:
+                data = f.read(2048)
+        except OSError:
+            continue
+        name = data[5:data.find(b'\n')].strip().decode('utf-8', 'replace')
+        if name == 'dropbear':
+            dropbear[int(pid)] = int(_field(data, b'PPid:') or 0)
+        elif name in SSHD_NAMES:
+            try:
+                with open(f'{proc}/{pid}/cmdline', 'rb') as f:
+                    cmdline = f.read(512).rstrip(b'\0')
+            except OSError:
+                continue
+            if cmdline.endswith(b'[priv]') and not cmdline.endswith(b'root [priv]'):
+                ssh += 1
+    return {'ssh': ssh, 'dropbear': sum(1 for ppid in dropbear.values() if ppid in dropbear)}
+
+def user_processes(uids, names, proc: str = PROC) -> list:
+    """PIDs a derrubar de uma vez para os usuários dados
+
+    Processos com UID efetivo em `uids` mais os monitores root do sshd
+    ('sshd: usuario [priv]'), que o 'pkill -f $user' antigo também pegava.
+    """
+    pids = []
+    for entry in os.scandir(proc):
+        pid = entry.name
+        if not pid.isdigit():
+            continue
+        info = _status(pid, proc)
+        if info is None:
+            continue
+        name, uid = info
+        if uid in uids:
+            pids.append(int(pid))
+        elif name in SSHD_NAMES:
+            try:
+                with open(f'{proc}/{pid}/cmdline', 'rb') as f:
+                    cmdline = f.read(512).rstrip(b'\0').decode('utf-8', 'replace')
+            except OSError:
+                continue
+            # 'sshd: usuario [priv]', 'sshd: usuario@pts/0', 'sshd-session: usuario [priv]'
+            owner = cmdline.partition(': ')[2].split(' ', 1)[0].split('@', 1)[0]
+            if owner in names:
+                pids.append(int(pid))
+    return pids
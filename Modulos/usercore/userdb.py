@@ -0,0 +1,250 @@
+# encoding: utf-8
+# SSHPLUS - Base de usuários indexada (SQLite em modo WAL)
+# Os módulos antigos liam o usuarios.db com 'grep -w' por usuário e mudavam
+# um limite reescrevendo o arquivo inteiro via /tmp, correndo com quem lia.
+# Aqui limite, senha e expiração ficam numa tabela com chave primária; cada
+# alteração é uma transação. O usuarios.db continua existindo como export
+# (gravado em arquivo temporário + rename, nunca pela metade) para os
+# scripts que ainda o leem, e edições externas nele são reimportadas.
+# Usuário novo só acrescenta a sua linha (um write com O_APPEND); remoções
+# em lote (remove_many, 'userdb del a b c') regravam o arquivo uma vez.
+
+import os
+import sqlite3
+import time
+
+from usercore.accounts import DATABASE
+
+STORE = '/etc/SSHPlus/usuarios.sqlite'
+SENHA_DIR = '/etc/SSHPlus/senha'
+SHADOW = '/etc/shadow'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS users (
+    name   TEXT PRIMARY KEY,
+    limite INTEGER NOT NULL DEFAULT 1,
+    senha  TEXT,
+    expira INTEGER          -- dias desde 1970 (campo 8 do /etc/shadow)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+def _signature(path: str) -> str:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ''
+    return f'{st.st_ino}:{st.st_size}:{st.st_mtime_ns}'
+
+def read_flat(path: str = DATABASE) -> dict:
+    """usuarios.db -> {usuario: limite}; a última linha de cada usuário vale"""
+    limits = {}
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[1].isdigit():
+                    limits[fields[0]] = int(fields[1])
+    except OSError:
+        pass
+    return limits
+
+def read_shadow(path: str = SHADOW) -> dict:
+    """usuario -> dia de expiração (só contas com data definida)"""
+    expiry = {}
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.rstrip('\n').split(':')
+                if len(fields) > 7 and fields[7].isdigit():
+                    expiry[fields[0]] = int(fields[7])
+    except OSError:
+        pass
+    return expiry
+
+def format_day(day) -> str:
+    """Dia desde 1970 -> dd/mm/aaaa (como o mudardata mostra)"""
+    if day is None:
+        return 'never'
+    return time.strftime('%d/%m/%Y', time.gmtime(day * 86400))
+
+class UserStore:
+    """Usuários com busca O(1) e alterações atômicas por usuário"""
+    def __init__(self, path: str = STORE, database: str = DATABASE,
+                 senha_dir: str = SENHA_DIR, shadow: str = SHADOW):
+        self.database = database
+        self.senha_dir = senha_dir
+        self.shadow = shadow
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(_SCHEMA)
+        self.sync()
+
+    def close(self):
+        self.db.close()
+
+    def _meta(self, key: str) -> str:
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else ''
+
+    def _set_meta(self, key: str, value: str):
+        self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+    def sync(self):
+        """Reimporta o usuarios.db / shadow se alguém os alterou por fora"""
+        if _signature(self.database) != self._meta('flat'):
+            self.import_flat()
+        if _signature(self.shadow) != self._meta('shadow'):
+            self.import_shadow()
+
+    def import_flat(self):
+        """Carga em lote: usuarios.db + /etc/SSHPlus/senha/* numa transação"""
+        limits = read_flat(self.database)
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('CREATE TEMP TABLE IF NOT EXISTS flat (name TEXT PRIMARY KEY, limite INTEGER)')
+            db.execute('DELETE FROM flat')
+            db.executemany('INSERT INTO flat VALUES (?, ?)', limits.items())
+            db.execute('DELETE FROM users WHERE name NOT IN (SELECT name FROM flat)')
+            # Sem UPSERT (SQLite >= 3.24): atualiza os que ficaram e insere os novos
+            db.execute('UPDATE users SET limite = (SELECT limite FROM flat WHERE flat.name = users.name)')
+            db.execute('INSERT OR IGNORE INTO users (name, limite) SELECT name, limite FROM flat')
+            senhas = [(self._read_senha(name), name) for name in limits]
+            db.executemany('UPDATE users SET senha = ? WHERE name = ?',
+                           [item for item in senhas if item[0] is not None])
+            self._set_meta('flat', _signature(self.database))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def import_shadow(self):
+        expiry = read_shadow(self.shadow)
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('UPDATE users SET expira = NULL')
+            db.executemany('UPDATE users SET expira = ? WHERE name = ?',
+                           [(day, name) for name, day in expiry.items()])
+            self._set_meta('shadow', _signature(self.shadow))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def _read_senha(self, name: str):
+        try:
+            with open(os.path.join(self.senha_dir, name), encoding='utf-8', errors='replace') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _export(self):
+        """Regrava o usuarios.db (temporário + rename) e anota a assinatura"""
+        tmp = f'{self.database}.{os.getpid()}.tmp'
+        # O texto inteiro sai pronto do SQLite: sem um objeto Python por linha
+        text = self.db.execute("SELECT group_concat(name || ' ' || limite || char(10), '') "
+                               'FROM (SELECT name, limite FROM users ORDER BY rowid)').fetchone()[0]
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text or '')
+        os.replace(tmp, self.database)
+        self._set_meta('flat', _signature(self.database))
+
+    def _append(self, name: str, limite: int):
+        """Usuário novo: uma linha no fim do usuarios.db em vez de regravá-lo"""
+        line = f'{name} {limite}\n'.encode()
+        with open(self.database, 'ab+') as f:
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    line = b'\n' + line
+            f.write(line)
+        self._set_meta('flat', _signature(self.database))
+
+    def _write(self, sql: str, params: tuple) -> bool:
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            changed = db.execute(sql, params).rowcount > 0
+            if changed:
+                self._export()
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return changed
+
+    def get(self, name: str):
+        """dict com name, limite, senha, expira ou None"""
+        cursor = self.db.execute('SELECT name, limite, senha, expira FROM users WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip(('name', 'limite', 'senha', 'expira'), row))
+
+    def users(self) -> list:
+        return self.db.execute('SELECT name, limite FROM users ORDER BY rowid').fetchall()
+
+    def add(self, name: str, limite: int, senha: str = None):
+        # INSERT OR IGNORE + UPDATE em vez de UPSERT: funciona em qualquer SQLite 3.
+        # O caso comum (usuário novo) só acrescenta uma linha ao usuarios.db
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if db.execute('INSERT OR IGNORE INTO users (name, limite, senha) VALUES (?, ?, ?)',
+                          (name, limite, senha)).rowcount > 0:
+                self._append(name, limite)
+            else:
+                db.execute('UPDATE users SET limite = ?, senha = coalesce(?, senha) WHERE name = ?',
+                           (limite, senha, name))
+                self._export()
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if senha is not None:
+            self._write_senha(name, senha)
+
+    def set_limit(self, name: str, limite: int) -> bool:
+        return self._write('UPDATE users SET limite = ? WHERE name = ?', (limite, name))
+
+    def set_password(self, name: str, senha: str) -> bool:
+        changed = self._write('UPDATE users SET senha = ? WHERE name = ?', (senha, name))
+        if changed:
+            self._write_senha(name, senha)
+        return changed
+
+    def remove(self, name: str) -> bool:
+        changed = self._write('DELETE FROM users WHERE name = ?', (name,))
+        try:
+            os.unlink(os.path.join(self.senha_dir, name))
+        except OSError:
+            pass
+        return changed
+
+    def remove_many(self, names) -> int:
+        """Remove vários usuários numa transação e um export só"""
+        names = list(names)
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            removed = db.executemany('DELETE FROM users WHERE name = ?', [(n,) for n in names]).rowcount
+            if removed > 0:
+                self._export()
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.senha_dir, name))
+            except OSError:
+                pass
+        return removed
+
+    def _write_senha(self, name: str, senha: str):
+        os.makedirs(self.senha_dir, exist_ok=True)
+        with open(os.path.join(self.senha_dir, name), 'w', encoding='utf-8') as f:
+            f.write(senha + '\n')
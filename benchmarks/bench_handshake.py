@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Microbenchmark do handshake: find_header x HeaderParser
+#
+# Uso: python3 benchmarks/bench_handshake.py [-n 200000]
+#   -n  repetições por payload
+#
+# find_header é o caminho antigo (uma busca no buffer inteiro por header,
+# X-Real-Host, X-Split e X-Pass); HeaderParser é o parser incremental que
+# separa todos os headers numa passada. Os payloads imitam os gerados pelos
+# apps injectors (HTTP Injector, HTTP Custom etc.). Para medir só o custo do
+# parse o find_header recebe o buffer já montado; a coluna "1 read" diz se o
+# caminho antigo (um único reader.read) acharia o X-Real-Host certo.
+
+import getopt
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Modulos'))
+
+from proxycore.handshake import HeaderParser, find_header
+
+UA = b'Mozilla/5.0 (Linux; Android 12; SM-A525M) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36'
+
+PAYLOADS = {
+    'connect': [
+        b'CONNECT 127.0.0.1:22 HTTP/1.1\r\n'
+        b'Host: m.facebook.com\r\n'
+        b'X-Real-Host: 127.0.0.1:22\r\n\r\n'
+    ],
+    'websocket': [
+        b'GET / HTTP/1.1\r\n'
+        b'Host: cdn.exemplo.com.br\r\n'
+        b'User-Agent: ' + UA + b'\r\n'
+        b'X-Online-Host: cdn.exemplo.com.br\r\n'
+        b'X-Forward-Host: cdn.exemplo.com.br\r\n'
+        b'Connection: Upgrade\r\n'
+        b'Upgrade: websocket\r\n'
+        b'X-Pass: senha123\r\n'
+        b'X-Real-Host: 127.0.0.1:22\r\n\r\n'
+    ],
+    'duplo': [
+        b'GET http://portalrecarga.vivo.com.br/recarga HTTP/1.1\r\n'
+        b'Host: portalrecarga.vivo.com.br\r\n'
+        b'User-Agent: ' + UA + b'\r\n'
+        b'Connection: Keep-Alive\r\n\r\n'
+        b'CONNECT 127.0.0.1:22 HTTP/1.1\r\n'
+        b'Host: portalrecarga.vivo.com.br\r\n'
+        b'X-Real-Host: 127.0.0.1:22\r\n'
+        b'X-Split: 1\r\n\r\n',
+        b'GET / HTTP/1.1\r\nHost: navegue.vivo.com.br\r\n\r\n'
+    ],
+    'segmentado': [
+        b'CONNECT 127.0.0.1:22 HTTP/1.1\r\nHost: m.face',
+        b'book.com\r\nUser-Agent: ' + UA + b'\r\nX-Real-',
+        b'Host: 127.0.0.1:22\r\nX-Pass: senha123\r\n\r\n'
+    ],
+}
+
+def legacy(chunks):
+    data = b''.join(chunks)
+    host = find_header(data, b'X-Real-Host')
+    find_header(data, b'X-Split')
+    find_header(data, b'X-Pass')
+    return host
+
+def parser(chunks):
+    p = HeaderParser(65536)
+    for chunk in chunks:
+        if p.feed(chunk):
+            break
+    p.get(b'x-pass')
+    return p.get(b'x-real-host')
+
+def bench(func, chunks, number: int) -> float:
+    """Melhor de 3 rodadas, em ns por handshake"""
+    best = min(timeit.repeat(lambda: func(chunks), number=number, repeat=3))
+    return best / number * 1e9
+
+def main(argv):
+    number = 200000
+    opts, _ = getopt.getopt(argv, "n:")
+    for opt, arg in opts:
+        if opt == '-n':
+            number = int(arg)
+
+    print(f"{'payload':<12}{'bytes':>7}{'find_header ns':>16}{'parser ns':>12}{'razão':>8}{'1 read':>8}")
+    for name, chunks in PAYLOADS.items():
+        assert parser(chunks) == legacy(chunks) == b'127.0.0.1:22', name
+        old = bench(legacy, chunks, number)
+        new = bench(parser, chunks, number)
+        size = sum(len(c) for c in chunks)
+        single = 'ok' if find_header(chunks[0], b'X-Real-Host') == b'127.0.0.1:22' else 'erro'
+        print(f"{name:<12}{size:>7}{old:>16.0f}{new:>12.0f}{new / old:>8.2f}{single:>8}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Custo de um ciclo do limiter: bash antigo x usercore
+#
+# Uso: python3 benchmarks/bench_limiter.py [-u 2000] [-s 50]
+#   -u  usuários simulados (passwd, usuarios.db e openvpn-status.log em /tmp)
+#   -s  usuários amostrados no caminho antigo (o total é extrapolado)
+#
+# O caminho antigo roda, por usuário, os mesmos pipes do fun_multilogin
+# (grep/cut no usuarios.db, ps|grep|wc, grep no status); o novo é uma
+# passada no /proc e um parse do status para todos.
+
+import getopt
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Modulos'))
+
+from usercore import openvpn, sessions
+from usercore.accounts import Accounts
+
+LEGACY = '''
+[[ $(grep -wc "$1" "$2") != '0' ]] && limit="$(grep -w $1 "$2" | cut -d' ' -f2)" || limit='1'
+conssh="$(ps -u root | grep sshd | wc -l)"
+ovp="$(grep -E ,"$1", "$3" | wc -l)"
+'''
+
+def fixtures(directory: str, users: int):
+    names = [f'user{i:05d}' for i in range(users)]
+    with open(os.path.join(directory, 'passwd'), 'w') as f:
+        f.writelines(f'{n}:x:{1000 + i}:{1000 + i}::/home/{n}:/bin/false\n' for i, n in enumerate(names))
+    with open(os.path.join(directory, 'usuarios.db'), 'w') as f:
+        f.writelines(f'{n} 2\n' for n in names)
+    with open(os.path.join(directory, 'status'), 'w') as f:
+        f.write('OpenVPN CLIENT LIST\nCommon Name,Real Address,Bytes Received,Bytes Sent,Connected Since\n')
+        f.writelines(f'{n},10.0.{i // 250}.{i % 250}:5000,1,1,x\n' for i, n in enumerate(names[::4]))
+        f.write('ROUTING TABLE\nGLOBAL STATS\nEND\n')
+    return names
+
+def main(argv):
+    users, sample = 2000, 50
+    opts, _ = getopt.getopt(argv, "u:s:")
+    for opt, arg in opts:
+        if opt == '-u':
+            users = int(arg)
+        elif opt == '-s':
+            sample = int(arg)
+
+    with tempfile.TemporaryDirectory() as directory:
+        names = fixtures(directory, users)
+        db, status = os.path.join(directory, 'usuarios.db'), os.path.join(directory, 'status')
+
+        started = time.perf_counter()
+        for name in names[:sample]:
+            subprocess.run(['bash', '-c', LEGACY, 'limiter', name, db, status], check=True)
+        legacy = (time.perf_counter() - started) / sample * users
+
+        accounts = Accounts(db, os.path.join(directory, 'passwd'))
+        accounts.users(), accounts.limits()  # primeira leitura fora da medida
+        runs = 20
+        started = time.perf_counter()
+        for _ in range(runs):
+            table = sessions.scan(accounts.users())
+            limits = accounts.limits()
+            clients = openvpn.read_status(status)
+            [u for u, a in clients.items() if len(a) > limits.get(u, 1)]
+        new = (time.perf_counter() - started) / runs
+        processes = len(os.listdir('/proc'))
+
+    print(f'{users} usuários, {processes} entradas no /proc')
+    print(f"{'bash (extrapolado)':<20}{legacy * 1000:>10.1f} ms/ciclo")
+    print(f"{'usercore':<20}{new * 1000:>10.2f} ms/ciclo")
+    print(f"{'razão':<20}{legacy / new:>10.0f}x")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Carga nos proxies: conexões/s, latência do handshake, throughput e RSS
+#
+# Uso: python3 benchmarks/bench_load.py [-P proxy|open|wsproxy] [-v legacy|async|optimized]
+#          [-n 1000] [-j 200] [-b 1048576] [-t connect|websocket|split] [-x senha]
+#          [-2 python2] [-o resultado.json]
+#      python3 benchmarks/bench_load.py -C antes.json depois.json
+#   -P  perfil (Modulos/<perfil>.py)
+#   -v  legacy = <perfil>_legacy.py (Python 2, threads); async = <perfil>_async.py
+#       com um processo (-w 1); optimized = <perfil>.py com um worker por CPU e
+#       relay splice (-w 0 -r splice)
+#   -n  túneis simultâneos
+#   -j  handshakes em andamento ao mesmo tempo
+#   -b  bytes de eco por túnel na fase de throughput (0 pula a fase)
+#   -t  payload de injector: CONNECT, GET com Upgrade: websocket, ou dois
+#       blocos com X-Split (o segundo vai 5 ms depois, como os apps mandam)
+#   -x  X-Pass enviado (o proxy sob teste usa o PASS do próprio perfil)
+#   -2  interpretador dos *_legacy.py
+#   -o  arquivo JSON (padrão benchmarks/results/<perfil>-<variante>-<n>-<data>.json)
+#   -C  compara dois ou mais JSON lado a lado
+#
+# Tudo roda em 127.0.0.1: o destino falso (fake_target.py, eco com banner SSH
+# ou calado como o OpenVPN) e o proxy em subprocessos próprios, o gerador de
+# carga neste processo. Fases: abre os N túneis (conexões/s e latência do
+# connect até o fim da resposta do proxy, e até o banner SSH), mede o RSS do
+# proxy com todos abertos, ecoa -b bytes por túnel ao mesmo tempo (throughput
+# e pico de RSS) e fecha tudo. O RSS soma o processo do proxy e seus workers.
+
+import asyncio
+import getopt
+import json
+import os
+import platform
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = os.path.join(ROOT, 'Modulos')
+RESULTS = os.path.join(ROOT, 'benchmarks', 'results')
+VARIANTS = ('legacy', 'async', 'optimized')
+PROFILES = {'proxy': 'ssh', 'open': 'openvpn', 'wsproxy': 'ssh'}   # perfil -> destino
+CHUNK = 16384
+SPLIT_DELAY = 0.005
+READY_TIMEOUT = 10.0
+HANDSHAKE_TIMEOUT = 10.0
+RSS_INTERVAL = 0.2
+UA = 'Mozilla/5.0 (Linux; Android 12; SM-A525M) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36'
+
+def payload(kind: str, target: str, password: str) -> list:
+    """Blocos que um app injector mandaria, na ordem"""
+    extra = f'X-Pass: {password}\r\n' if password else ''
+    if kind == 'connect':
+        return [f'CONNECT {target} HTTP/1.1\r\nHost: m.facebook.com\r\n'
+                f'X-Real-Host: {target}\r\n{extra}\r\n'.encode()]
+    if kind == 'websocket':
+        return [f'GET / HTTP/1.1\r\nHost: cdn.exemplo.com.br\r\nUser-Agent: {UA}\r\n'
+                f'Connection: Upgrade\r\nUpgrade: websocket\r\n'
+                f'X-Real-Host: {target}\r\n{extra}\r\n'.encode()]
+    return [f'GET http://portalrecarga.vivo.com.br/recarga HTTP/1.1\r\n'
+            f'Host: portalrecarga.vivo.com.br\r\nUser-Agent: {UA}\r\n'
+            f'X-Real-Host: {target}\r\n{extra}X-Split: 1\r\n\r\n'.encode(),
+            b'GET / HTTP/1.1\r\nHost: navegue.vivo.com.br\r\n\r\n']
+
+def command(profile: str, variant: str, port: int, python2: str) -> list:
+    if variant == 'legacy':
+        return [python2, os.path.join(MODULOS, f'{profile}_legacy.py'), str(port)]
+    # -f vazio: o /etc/SSHPlus/<perfil>.conf da máquina não entra na medição
+    base = [sys.executable, os.path.join(MODULOS, f'{profile}_async.py' if variant == 'async'
+                                         else f'{profile}.py'),
+            str(port), '-b', '127.0.0.1', '-f', os.devnull]
+    if variant == 'async':
+        return base + ['-w', '1']
+    return base + ['-w', '0', '-r', 'splice']
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def raise_nofile(tunnels: int):
+    """Cliente, proxy (2 por túnel) e destino herdam o limite deste processo"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = max(soft, min(hard, tunnels * 3 + 1024)) if hard != resource.RLIM_INFINITY else tunnels * 3 + 1024
+    if want > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+
+def children(pid: int) -> list:
+    """pid e todos os descendentes (workers do modo -w)"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            parents.setdefault(ppid, []).append(int(entry))
+    found, queue = [], [pid]
+    while queue:
+        current = queue.pop()
+        found.append(current)
+        queue.extend(parents.get(current, ()))
+    return found
+
+def rss_kib(pid: int) -> int:
+    total = 0
+    for proc in children(pid):
+        try:
+            with open(f'/proc/{proc}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total
+
+def percentiles(samples: list) -> dict:
+    """Em ms; exatos (amostras ordenadas), não estimados"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50': round(pick(0.5), 3),
+        'p90': round(pick(0.9), 3),
+        'p99': round(pick(0.99), 3),
+        'max': round(ordered[-1] * 1000, 3),
+    }
+
+def wait_ready(port: int, proc: subprocess.Popen):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'proxy saiu com código {proc.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f'proxy não abriu a porta {port} em {READY_TIMEOUT:g}s')
+
+def stop(proc: subprocess.Popen):
+    """SIGTERM no grupo (drena sem túneis abertos); SIGKILL se demorar"""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+    except ProcessLookupError:
+        pass
+
+class Tunnel:
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+async def open_tunnel(port: int, blocks: list, banner: bool, limit: asyncio.Semaphore,
+                      handshakes: list, first_bytes: list, errors: dict):
+    async with limit:
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', port), HANDSHAKE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            errors['connect'] = errors.get('connect', 0) + 1
+            return None
+        try:
+            for index, block in enumerate(blocks):
+                if index:
+                    await asyncio.sleep(SPLIT_DELAY)
+                writer.write(block)
+                await writer.drain()
+            status = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HANDSHAKE_TIMEOUT)
+            if status.split(b' ', 2)[1:2] not in ([b'200'], [b'101']):
+                errors['status'] = errors.get('status', 0) + 1
+                writer.close()
+                return None
+            handshakes.append(time.perf_counter() - started)
+            if banner:
+                await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+                first_bytes.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError):
+            errors['handshake'] = errors.get('handshake', 0) + 1
+            writer.close()
+            return None
+        return Tunnel(reader, writer)
+
+async def echo(tunnel: Tunnel, nbytes: int) -> int:
+    """Manda nbytes e lê de volta; devolve quantos voltaram"""
+    data = b'\xa5' * CHUNK
+
+    async def send():
+        sent = 0
+        while sent < nbytes:
+            piece = data[:min(CHUNK, nbytes - sent)]
+            tunnel.writer.write(piece)
+            await tunnel.writer.drain()
+            sent += len(piece)
+
+    async def receive():
+        got = 0
+        while got < nbytes:
+            chunk = await tunnel.reader.read(65536)
+            if not chunk:
+                break
+            got += len(chunk)
+        return got
+
+    try:
+        _, got = await asyncio.gather(send(), receive())
+        return got
+    except (OSError, asyncio.IncompleteReadError):
+        return 0
+
+async def load(port: int, pid: int, options: dict, target_port: int) -> dict:
+    blocks = payload(options['payload'], f'127.0.0.1:{target_port}', options['password'])
+    banner = PROFILES[options['profile']] == 'ssh'
+    limit = asyncio.Semaphore(options['parallel'])
+    handshakes, first_bytes, errors = [], [], {}
+    rss_idle = rss_kib(pid)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        open_tunnel(port, blocks, banner, limit, handshakes, first_bytes, errors)
+        for _ in range(options['tunnels'])))
+    connect_seconds = time.perf_counter() - started
+    tunnels = [t for t in results if t is not None]
+    await asyncio.sleep(0.5)     # o proxy termina de alocar os buffers dos túneis
+    rss_open = rss_kib(pid)
+
+    throughput = {}
+    peak = rss_open
+    if options['bytes'] and tunnels:
+        done = asyncio.Event()
+
+        async def sample():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, rss_kib(pid))
+                await asyncio.sleep(RSS_INTERVAL)
+
+        sampler = asyncio.create_task(sample())
+        started = time.perf_counter()
+        echoed = await asyncio.gather(*(echo(t, options['bytes']) for t in tunnels))
+        seconds = time.perf_counter() - started
+        done.set()
+        await sampler
+        total = sum(echoed) * 2     # ida e volta passam pelo proxy
+        throughput = {
+            'bytes': total,
+            'seconds': round(seconds, 3),
+            'mbps': round(total * 8 / seconds / 1e6, 1),
+            'incomplete': sum(1 for n in echoed if n < options['bytes']),
+        }
+
+    for tunnel in tunnels:
+        tunnel.writer.close()
+    await asyncio.sleep(0.2)
+
+    return {
+        'connect': {
+            'ok': len(tunnels),
+            'failed': errors,
+            'seconds': round(connect_seconds, 3),
+            'cps': round(len(tunnels) / connect_seconds, 1) if connect_seconds else 0.0,
+        },
+        'handshake_ms': percentiles(handshakes),
+        'first_byte_ms': percentiles(first_bytes),
+        'throughput': throughput,
+        'rss_kib': {'idle': rss_idle, 'tunnels': rss_open, 'peak': peak},
+    }
+
+def run(options: dict) -> dict:
+    raise_nofile(options['tunnels'])
+    profile, variant = options['profile'], options['variant']
+    python2 = options['python2']
+    if variant == 'legacy' and not shutil.which(python2):
+        raise RuntimeError(f'{python2} não encontrado (os *_legacy.py são Python 2); use -2')
+
+    target = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_target.py'),
+         '-m', PROFILES[profile]], stdout=subprocess.PIPE, text=True)
+    port = free_port()
+    argv = command(profile, variant, port, python2)
+    proxy = None
+    try:
+        target_port = int(target.stdout.readline())
+        proxy = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                 start_new_session=True)
+        wait_ready(port, proxy)
+        measured = asyncio.run(load(port, proxy.pid, options, target_port))
+    finally:
+        if proxy is not None:
+            stop(proxy)
+        target.terminate()
+        target.wait()
+
+    return {
+        'profile': profile,
+        'variant': variant,
+        'command': [os.path.relpath(arg, ROOT) if arg.startswith(ROOT) else arg for arg in argv],
+        'tunnels': options['tunnels'],
+        'parallel': options['parallel'],
+        'payload': options['payload'],
+        'bytes_per_tunnel': options['bytes'],
+        'target': PROFILES[profile],
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'cpus': os.cpu_count(), 'python': platform.python_version(),
+                 'kernel': platform.release()},
+        **measured,
+    }
+
+ROWS = [
+    ('túneis abertos', lambda r: r['connect']['ok']),
+    ('conexões/s', lambda r: r['connect']['cps']),
+    ('handshake p50 ms', lambda r: r['handshake_ms'].get('p50')),
+    ('handshake p99 ms', lambda r: r['handshake_ms'].get('p99')),
+    ('1º byte p99 ms', lambda r: r['first_byte_ms'].get('p99')),
+    ('throughput Mbit/s', lambda r: r['throughput'].get('mbps')),
+    ('RSS parado KiB', lambda r: r['rss_kib']['idle']),
+    ('RSS com túneis KiB', lambda r: r['rss_kib']['tunnels']),
+    ('RSS pico KiB', lambda r: r['rss_kib']['peak']),
+]
+
+def compare(paths: list):
+    runs = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            runs.append(json.load(f))
+    names = [f"{r['profile']}/{r['variant']}" for r in runs]
+    width = max(14, *(len(n) + 2 for n in names))
+    print(f"{'':<20}" + ''.join(f'{n:>{width}}' for n in names))
+    print(f"{'túneis (-n)':<20}" + ''.join(f"{r['tunnels']:>{width}}" for r in runs))
+    for label, get in ROWS:
+        values = []
+        for r in runs:
+            value = get(r)
+            values.append('-' if value is None else f'{value:g}')
+        print(f'{label:<20}' + ''.join(f'{v:>{width}}' for v in values))
+
+def report(result: dict):
+    connect, hs = result['connect'], result['handshake_ms']
+    print(f"{result['profile']}/{result['variant']}: {connect['ok']}/{result['tunnels']} túneis "
+          f"em {connect['seconds']}s ({connect['cps']} conexões/s), falhas {connect['failed'] or 0}")
+    if hs:
+        print(f"handshake ms: p50 {hs['p50']}  p90 {hs['p90']}  p99 {hs['p99']}  máx {hs['max']}")
+    if result['first_byte_ms']:
+        print(f"até o banner SSH ms: p50 {result['first_byte_ms']['p50']}  p99 {result['first_byte_ms']['p99']}")
+    if result['throughput']:
+        tp = result['throughput']
+        print(f"throughput: {tp['mbps']} Mbit/s ({tp['bytes']} bytes em {tp['seconds']}s, "
+              f"{tp['incomplete']} túneis incompletos)")
+    rss = result['rss_kib']
+    print(f"RSS KiB: parado {rss['idle']}  com túneis {rss['tunnels']}  pico {rss['peak']}")
+
+def main(argv):
+    options = {'profile': 'proxy', 'variant': 'async', 'tunnels': 1000, 'parallel': 200,
+               'bytes': 1 << 20, 'payload': 'connect', 'password': '', 'python2': 'python2'}
+    output = None
+    opts, args = getopt.getopt(argv, "P:v:n:j:b:t:x:2:o:C")
+    for opt, arg in opts:
+        if opt == '-C':
+            compare(args)
+            return
+        elif opt == '-P':
+            options['profile'] = arg
+        elif opt == '-v':
+            options['variant'] = arg
+        elif opt == '-n':
+            options['tunnels'] = int(arg)
+        elif opt == '-j':
+            options['parallel'] = int(arg)
+        elif opt == '-b':
+            options['bytes'] = int(arg)
+        elif opt == '-t':
+            options['payload'] = arg
+        elif opt == '-x':
+            options['password'] = arg
+        elif opt == '-2':
+            options['python2'] = arg
+        elif opt == '-o':
+            output = arg
+    if options['profile'] not in PROFILES or options['variant'] not in VARIANTS \
+            or options['payload'] not in ('connect', 'websocket', 'split'):
+        print('Uso: veja o cabeçalho de benchmarks/bench_load.py')
+        sys.exit(2)
+
+    result = run(options)
+    report(result)
+    if output is None:
+        os.makedirs(RESULTS, exist_ok=True)
+        output = os.path.join(RESULTS, f"{options['profile']}-{options['variant']}-"
+                                       f"{options['tunnels']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f'Resultado: {output}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
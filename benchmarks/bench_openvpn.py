@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Kills na gerência do OpenVPN: conexão por kill x ManagementClient
+#
+# Uso: python3 benchmarks/bench_openvpn.py [-c 2000] [-k 500] [-e]
+#   -c  clientes conectados na gerência falsa (benchmarks/fake_openvpn.py)
+#   -k  kills medidos em cada modo
+#   -e  gerência com eventos >CLIENT: (a tabela acompanha sem 'status 3')
+#
+# "por conexão" é o caminho do limiter antigo sem o fork do telnet: abrir,
+# mandar 'kill', esperar a resposta e fechar, um cliente por vez. O
+# ManagementClient usa a conexão persistente: latência de um kill isolado
+# e vazão de um lote com todos os kills escritos de uma vez.
+
+import asyncio
+import getopt
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Modulos'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openvpn import FakeManagement
+from usercore.ovpnmgmt import ManagementClient
+
+async def kill_per_connection(port: int, addr: str):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    await reader.readline()     # >INFO
+    writer.write(f'kill {addr}\nquit\n'.encode())
+    await reader.readline()
+    writer.close()
+
+async def bench(count: int, kills: int, events: bool):
+    fake = FakeManagement(events)
+    addrs = [fake.connect_client(f'user{i % 1000:04d}') for i in range(count)]
+    port = await fake.start()
+    client = ManagementClient(('127.0.0.1', port), poll=3600)
+    client.start()
+    await client.connected.wait()
+    started = time.perf_counter()
+    sessions = await client.refresh()
+    refresh = time.perf_counter() - started
+    assert sum(len(a) for a in sessions.values()) == count
+
+    # 1) uma conexão por kill
+    legacy = []
+    for addr in addrs[:kills]:
+        started = time.perf_counter()
+        await kill_per_connection(port, addr)
+        legacy.append(time.perf_counter() - started)
+
+    # 2) kill isolado na conexão persistente
+    single = []
+    for addr in addrs[kills:2 * kills]:
+        started = time.perf_counter()
+        assert await client.kill([addr]) == 1
+        single.append(time.perf_counter() - started)
+
+    # 3) lote
+    batch = addrs[2 * kills:3 * kills]
+    started = time.perf_counter()
+    killed = await client.kill(batch)
+    elapsed = time.perf_counter() - started
+    assert killed == len(batch), killed
+
+    tracked = None
+    if events:
+        fake.connect_client('evento')
+        await asyncio.sleep(0.05)
+        tracked = 'evento' in client.sessions()
+
+    await client.close()
+    await fake.stop()
+
+    print(f'{count} clientes, {kills} kills por modo, status 3 em {refresh * 1000:.1f} ms')
+    print(f"{'modo':<22}{'p50 ms':>9}{'p99 ms':>9}{'kills/s':>10}")
+    for name, samples in (('conexão por kill', legacy), ('persistente (1 a 1)', single)):
+        samples.sort()
+        print(f'{name:<22}{statistics.median(samples) * 1000:>9.3f}'
+              f'{samples[int(len(samples) * 0.99) - 1] * 1000:>9.3f}{len(samples) / sum(samples):>10.0f}')
+    print(f"{'persistente (lote)':<22}{'':>9}{'':>9}{len(batch) / elapsed:>10.0f}")
+    if tracked is not None:
+        print(f"evento ESTABLISHED na tabela: {'sim' if tracked else 'não'}")
+
+def main(argv):
+    count, kills, events = 2000, 500, False
+    opts, _ = getopt.getopt(argv, "c:k:e")
+    for opt, arg in opts:
+        if opt == '-c':
+            count = int(arg)
+        elif opt == '-k':
+            kills = int(arg)
+        elif opt == '-e':
+            events = True
+    if 3 * kills > count:
+        sys.exit('-k precisa ser no máximo um terço de -c')
+    asyncio.run(bench(count, kills, events))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
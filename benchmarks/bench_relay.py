@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Benchmark do relay: CPU por Gbit no modo stream vs splice
+#
+# Uso: python3 benchmarks/bench_relay.py [-m 512] [-c 4]
+#   -m  MiB transferidos por modo
+#   -c  túneis simultâneos
+#
+# O relay roda num subprocesso isolado (perfil Modulos/proxy.py sobre proxycore) e
+# mede o próprio consumo de CPU com getrusage; emissor e destino ficam neste
+# processo para não contaminar a medição.
+
+import getopt
+import importlib.util
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = os.path.join(ROOT, 'Modulos')
+CHUNK = 1 << 16
+
+def load_profile():
+    sys.path.insert(0, MODULOS)
+    spec = importlib.util.spec_from_file_location('proxy_http', os.path.join(MODULOS, 'proxy.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.PROFILE
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def serve(mode: str, target_port: int, tunnels: int):
+    """Lado do relay: aceita `tunnels` clientes e repassa para o destino"""
+    import asyncio
+    config = load_profile()
+    config.relay = mode
+    from proxycore.idle import IdleWheel
+    from proxycore.metrics import Metrics
+    from proxycore.relay import bidirectional_proxy, setup_relay
+    setup_relay(config)
+    metrics = Metrics()
+    idle = IdleWheel(config.timeout)
+
+    async def main():
+        done = asyncio.Event()
+        finished = 0
+
+        async def handle(reader, writer):
+            nonlocal finished
+            target_reader, target_writer = await asyncio.open_connection('127.0.0.1', target_port)
+            await bidirectional_proxy(config, metrics, reader, writer, target_reader, target_writer, idle)
+            finished += 1
+            if finished == tunnels:
+                done.set()
+
+        listener = await asyncio.start_server(handle, '127.0.0.1', 0)
+        cpu_start = cpu_seconds()
+        print(listener.sockets[0].getsockname()[1], config.relay, flush=True)
+        await done.wait()
+        print(json.dumps({'cpu': cpu_seconds() - cpu_start}), flush=True)
+        listener.close()
+
+    asyncio.run(main())
+
+def sink(listener: socket.socket, tunnels: int, counts: list):
+    conns = [listener.accept()[0] for _ in range(tunnels)]
+
+    def drain(conn, idx):
+        total = 0
+        while True:
+            data = conn.recv(CHUNK)
+            if not data:
+                break
+            total += len(data)
+        counts[idx] = total
+        conn.close()
+
+    threads = [threading.Thread(target=drain, args=(c, i)) for i, c in enumerate(conns)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def send(port: int, nbytes: int):
+    payload = b'\0' * CHUNK
+    with socket.create_connection(('127.0.0.1', port)) as conn:
+        sent = 0
+        while sent < nbytes:
+            conn.sendall(payload)
+            sent += CHUNK
+
+def run(mode: str, mib: int, tunnels: int) -> dict:
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(tunnels)
+    counts = [0] * tunnels
+    sink_thread = threading.Thread(target=sink, args=(listener, tunnels, counts))
+    sink_thread.start()
+
+    relay = subprocess.Popen(
+        [sys.executable, __file__, '--serve', mode,
+         str(listener.getsockname()[1]), str(tunnels)],
+        stdout=subprocess.PIPE, text=True
+    )
+    port, effective = relay.stdout.readline().split()
+    per_tunnel = mib * (1 << 20) // tunnels
+
+    start = time.monotonic()
+    senders = [threading.Thread(target=send, args=(int(port), per_tunnel)) for _ in range(tunnels)]
+    for t in senders:
+        t.start()
+    for t in senders:
+        t.join()
+    sink_thread.join()
+    elapsed = time.monotonic() - start
+
+    cpu = json.loads(relay.stdout.readline())['cpu']
+    relay.wait()
+    listener.close()
+
+    gbits = sum(counts) * 8 / 1e9
+    return {
+        'mode': effective,
+        'bytes': sum(counts),
+        'seconds': round(elapsed, 3),
+        'gbps': round(gbits / elapsed, 3),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_per_gbit': round(cpu / gbits, 4),
+    }
+
+def main(argv):
+    if argv and argv[0] == '--serve':
+        serve(argv[1], int(argv[2]), int(argv[3]))
+        return
+
+    mib, tunnels = 512, 4
+    opts, _ = getopt.getopt(argv, "m:c:")
+    for opt, arg in opts:
+        if opt == '-m':
+            mib = int(arg)
+        elif opt == '-c':
+            tunnels = int(arg)
+
+    print(f"{'modo':<8}{'GiB':>8}{'Gbit/s':>10}{'CPU s':>10}{'CPU s/Gbit':>12}")
+    for mode in ('stream', 'splice'):
+        r = run(mode, mib, tunnels)
+        print(f"{r['mode']:<8}{r['bytes'] / (1 << 30):>8.2f}{r['gbps']:>10.3f}"
+              f"{r['cpu_seconds']:>10.3f}{r['cpu_per_gbit']:>12.4f}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Custo do limite de banda por chunk (proxycore/shaping.py)
+#
+# Uso: python3 benchmarks/bench_shaping.py [-n 500000] [-k 16384]
+#   -n  chunks por cenário
+#   -k  tamanho do chunk em bytes
+#
+# Mede o que o relay paga a cada leitura: sem limite (um teste de None),
+# só por túnel, e túnel + usuário + total (três baldes). As taxas são altas
+# para medir o caminho sem pausa; a coluna "taxa obtida" simula um túnel
+# lendo sempre que o balde libera, num relógio virtual, e compara com a
+# taxa configurada (o excedente é o burst inicial).
+
+import getopt
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Modulos'))
+
+from proxycore.config import ProxyConfig
+from proxycore.shaping import Shaper, kbit
+
+SCENARIOS = {
+    'sem limite': {},
+    'túnel': {'rate_tunnel': 10000000},
+    'túnel+usuário+total': {'rate_tunnel': 10000000, 'rate_user': 20000000, 'rate_total': 40000000},
+}
+
+def make_limits(rates: dict):
+    config = ProxyConfig('bench.py', 'bench', 'bench', '127.0.0.1:22', 22)
+    for attr, value in rates.items():
+        setattr(config, attr, value)
+    return config, Shaper(config).open('senha', 0.0)
+
+def per_chunk(rates: dict, number: int, chunk: int) -> float:
+    """ns por chunk do trecho do pipe que consulta o limite"""
+    _, limits = make_limits(rates)
+    take = limits.download if limits else None
+    clock = [0.0]
+
+    def step():
+        clock[0] += 1e-6
+        if take is not None:
+            take(chunk, clock[0])
+
+    best = min(timeit.repeat(step, number=number, repeat=3))
+    return best / number * 1e9
+
+def achieved(rates: dict, chunk: int, seconds: float = 10.0) -> float:
+    """Taxa (kbit/s) de um túnel que lê assim que o limite permite"""
+    _, limits = make_limits({key: value / 1000 for key, value in rates.items()})
+    if limits is None:
+        return 0.0
+    now = sent = 0.0
+    while now < seconds:
+        sent += chunk
+        now += limits.download(chunk, now)
+    return sent / now / 125
+
+def main(argv):
+    number, chunk = 500000, 16384
+    opts, _ = getopt.getopt(argv, "n:k:")
+    for opt, arg in opts:
+        if opt == '-n':
+            number = int(arg)
+        elif opt == '-k':
+            chunk = int(arg)
+
+    print(f"{'cenário':<22}{'baldes':>7}{'ns/chunk':>10}{'limite kbit/s':>13}{'obtida':>10}")
+    for name, rates in SCENARIOS.items():
+        _, limits = make_limits(rates)
+        buckets = len(limits.down) if limits else 0
+        configured = min((value / 1000 for value in rates.values()), default=0)
+        got = achieved(rates, chunk)
+        print(f"{name:<22}{buckets:>7}{per_chunk(rates, number, chunk):>10.0f}"
+              f"{configured:>13.0f}{got:>10.0f}")
+    print(f"\nchunk de {chunk} bytes; 1 Gbit/s = {kbit(1000000) / chunk:.0f} chunks/s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
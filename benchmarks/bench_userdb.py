@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Base de usuários: usuarios.db plano x UserStore (SQLite WAL)
+#
+# Uso: python3 benchmarks/bench_userdb.py [-u 2000] [-n 2000]
+#   -u  usuários na base
+#   -n  operações medidas
+#
+# "plano" reproduz em Python o que os módulos fazem no shell (varrer o
+# arquivo para achar um usuário; grep -v + reescrita para mudar o limite),
+# sem contar o custo dos forks. O UserStore inclui o export atômico do
+# usuarios.db a cada alteração.
+
+import getopt
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Modulos'))
+
+from usercore.userdb import UserStore
+
+def flat_get(path, user):
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if fields and fields[0] == user:
+                return int(fields[1])
+    return None
+
+def flat_set(path, user, limit):
+    with open(path) as f:
+        lines = [line for line in f if not line.startswith(user + ' ')]
+    with open('/tmp/bench_userdb_a', 'w') as f:
+        f.writelines(lines)
+    os.rename('/tmp/bench_userdb_a', path)
+    with open(path, 'a') as f:
+        f.write(f'{user} {limit}\n')
+
+def timed(func, items) -> float:
+    """us por operação"""
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+def main(argv):
+    users, number = 2000, 2000
+    opts, _ = getopt.getopt(argv, "u:n:")
+    for opt, arg in opts:
+        if opt == '-u':
+            users = int(arg)
+        elif opt == '-n':
+            number = int(arg)
+
+    names = [f'user{i:05d}' for i in range(users)]
+    sample = [random.choice(names) for _ in range(number)]
+    with tempfile.TemporaryDirectory() as directory:
+        flat = os.path.join(directory, 'usuarios.db')
+        with open(flat, 'w') as f:
+            f.writelines(f'{name} 1\n' for name in names)
+        store = UserStore(os.path.join(directory, 'usuarios.sqlite'), flat,
+                          os.path.join(directory, 'senha'), os.path.join(directory, 'shadow'))
+
+        rows = [
+            ('busca', timed(lambda u: flat_get(flat, u), sample), timed(store.get, sample)),
+            ('limite', timed(lambda u: flat_set(flat, u, 2), sample[:200]),
+             timed(lambda u: store.set_limit(u, 3), sample[:200])),
+        ]
+        store.close()
+
+    print(f'{users} usuários')
+    print(f"{'operação':<10}{'plano us':>12}{'UserStore us':>14}")
+    for name, old, new in rows:
+        print(f'{name:<10}{old:>12.1f}{new:>14.1f}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
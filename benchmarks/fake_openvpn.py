@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Interface de gerência do OpenVPN falsa, para testes e benchmarks
+#
+# Uso: python3 benchmarks/fake_openvpn.py [-p 7505] [-c 100] [-e]
+#   -p  porta (só 127.0.0.1)
+#   -c  clientes conectados na largada (user0000, user0001, ...)
+#   -e  manda os eventos >CLIENT: (como com management-client-auth)
+#
+# Atende 'status 3', 'kill <ip:porta>', 'client-auth-nt' e 'quit' com as
+# mesmas respostas do OpenVPN 2.5/2.6.
+
+import asyncio
+import getopt
+import sys
+import time
+
+GREETING = b">INFO:OpenVPN Management Interface Version 5 -- type 'help' for more info\r\n"
+
+class FakeManagement:
+    def __init__(self, events: bool = False):
+        self.events = events
+        self.clients = {}   # endereço -> (cid, usuario, desde)
+        self.kills = 0
+        self._next_cid = 0
+        self._writers = set()
+        self._tasks = set()
+        self.server = None
+
+    async def start(self, port: int = 0) -> int:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        for writer in list(self._writers):
+            writer.close()
+        # Os handlers terminam sozinhos com o EOF; cancelados, o asyncio
+        # 3.11 loga CancelledError no callback do StreamReaderProtocol
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def _broadcast(self, lines):
+        data = ''.join(line + '\r\n' for line in lines).encode()
+        for writer in self._writers:
+            writer.write(data)
+
+    def _env(self, event: str, cid: int, user: str, addr: str):
+        ip, port = addr.rsplit(':', 1)
+        return [f'>CLIENT:{event},{cid}', f'>CLIENT:ENV,common_name={user}',
+                f'>CLIENT:ENV,trusted_ip={ip}', f'>CLIENT:ENV,trusted_port={port}',
+                '>CLIENT:ENV,END']
+
+    def connect_client(self, user: str) -> str:
+        """Simula um cliente autenticado; devolve o endereço real"""
+        cid = self._next_cid
+        self._next_cid += 1
+        addr = f'10.{cid >> 16 & 255}.{cid >> 8 & 255}.{cid & 255}:{40000 + cid % 20000}'
+        self.clients[addr] = (cid, user, int(time.time()))
+        if self.events:
+            self._broadcast(self._env('ESTABLISHED', cid, user, addr))
+        return addr
+
+    def status(self) -> list:
+        lines = ['TITLE\tOpenVPN 2.6.3 x86_64-pc-linux-gnu (fake)',
+                 f'TIME\t{time.ctime()}\t{int(time.time())}',
+                 'HEADER\tCLIENT_LIST\tCommon Name\tReal Address\tVirtual Address\tVirtual IPv6 Address'
+                 '\tBytes Received\tBytes Sent\tConnected Since\tConnected Since (time_t)\tUsername'
+                 '\tClient ID\tPeer ID\tData Channel Cipher']
+        for i, (addr, (cid, user, since)) in enumerate(self.clients.items()):
+            lines.append(f'CLIENT_LIST\t{user}\t{addr}\t10.8.{i >> 8 & 255}.{i & 255}\t\t1000\t2000'
+                         f'\t{time.ctime(since)}\t{since}\tUNDEF\t{cid}\t{cid}\tAES-256-GCM')
+        lines += ['HEADER\tROUTING_TABLE\tVirtual Address\tCommon Name\tReal Address\tLast Ref\tLast Ref (time_t)',
+                  'GLOBAL_STATS\tMax bcast/mcast queue length\t0', 'END']
+        return lines
+
+    def command(self, line: str) -> list:
+        name, _, arg = line.partition(' ')
+        if name == 'status':
+            return self.status()
+        if name == 'kill':
+            client = self.clients.pop(arg, None)
+            if client is None:
+                return [f'ERROR: common name \'{arg}\' not found']
+            self.kills += 1
+            if self.events:
+                self._broadcast(self._env('DISCONNECT', client[0], client[1], arg))
+            return [f'SUCCESS: 1 client(s) at address {arg} killed']
+        if name == 'client-auth-nt':
+            return ['SUCCESS: client-auth command succeeded']
+        return ["ERROR: unknown command, enter 'help' for more options"]
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._writers.add(writer)
+        writer.write(GREETING)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if line in ('quit', 'exit'):
+                    break
+                if line:
+                    writer.write(''.join(l + '\r\n' for l in self.command(line)).encode())
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._tasks.discard(task)
+            writer.close()
+
+async def serve(port: int, count: int, events: bool):
+    fake = FakeManagement(events)
+    for i in range(count):
+        fake.connect_client(f'user{i % 1000:04d}')
+    port = await fake.start(port)
+    print(f'gerência falsa em 127.0.0.1:{port} com {count} clientes')
+    await asyncio.Event().wait()
+
+def main(argv):
+    port, count, events = 7505, 100, False
+    opts, _ = getopt.getopt(argv, "p:c:e")
+    for opt, arg in opts:
+        if opt == '-p':
+            port = int(arg)
+        elif opt == '-c':
+            count = int(arg)
+        elif opt == '-e':
+            events = True
+    try:
+        asyncio.run(serve(port, count, events))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# encoding: utf-8
+# SSHPLUS - Destino falso (SSH/OpenVPN) para os benchmarks dos proxies
+#
+# Uso: python3 benchmarks/fake_target.py [-p 2222] [-m ssh|openvpn]
+#   -p  porta (só 127.0.0.1; 0 escolhe uma livre)
+#   -m  ssh manda um banner SSH-2.0 ao conectar, como o sshd/dropbear;
+#       openvpn fica calado até o cliente falar
+#
+# Depois do banner tudo que chega volta igual (eco). A porta escolhida é a
+# primeira linha do stdout, para quem roda este script como subprocesso.
+
+import asyncio
+import getopt
+import signal
+import sys
+
+BANNER = b'SSH-2.0-OpenSSH_8.9p1 SSHPLUS-bench\r\n'
+
+class Echo(asyncio.Protocol):
+    def __init__(self, banner: bytes):
+        self.banner = banner
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.banner:
+            transport.write(self.banner)
+
+    def data_received(self, data):
+        self.transport.write(data)
+
+    def pause_writing(self):
+        # Cliente lento: para de ler até ele esvaziar o buffer
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+async def start(port: int = 0, mode: str = 'ssh') -> asyncio.AbstractServer:
+    banner = BANNER if mode == 'ssh' else b''
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(lambda: Echo(banner), '127.0.0.1', port, backlog=4096)
+
+async def main(port: int, mode: str):
+    server = await start(port, mode)
+    print(server.sockets[0].getsockname()[1], flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    server.close()
+
+if __name__ == '__main__':
+    port, mode = 0, 'ssh'
+    opts, _ = getopt.getopt(sys.argv[1:], "p:m:")
+    for opt, arg in opts:
+        if opt == '-p':
+            port = int(arg)
+        elif opt == '-m':
+            mode = arg
+    asyncio.run(main(port, mode))